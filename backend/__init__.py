@@ -1,17 +1,45 @@
+from importlib import import_module
+from typing import Iterable, Optional
 from flask import Flask
 from flask_restx import Api
-from .auth.views import auth_namespace
-from .stocks.views import stocks_namespace
-from .strategies.views import strategies_namespace
-from .optimizer.views import metrics_namespace
+from .auth.identity import identity_cache
+from .optimizer.cache import result_cache
+from .jobs.store import job_store
+from .utils.metrics import request_metrics
+from .strategies.signals import signal_store
 from .config.config import config_dict
 from .utils import db
+# every model is imported so its table is registered whichever namespaces are served
 from .models.users import User
+from .models.stocks import Stock
+from .models.tickers import TickerInfo
+from .models.prices import Price, PriceSync
+from .models.metrics import PortfolioMetrics
+from .models.signals import Signal
+from .stocks.metadata import refresh_ticker_info
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 
+# namespace name -> (module, attribute), a namespace's module is only imported when it is registered
+NAMESPACES = {
+    'auth': ('.auth.views', 'auth_namespace'),
+    'stocks': ('.stocks.views', 'stocks_namespace'),
+    'strategies': ('.strategies.views', 'strategies_namespace'),
+    'metrics': ('.optimizer.views', 'metrics_namespace'),
+    'jobs': ('.jobs.views', 'jobs_namespace'),
+    'monitoring': ('.monitoring.views', 'monitoring_namespace')
+}
 
-def create_app(config=config_dict['dev']):
+
+def create_app(config=config_dict['dev'], namespaces: Optional[Iterable[str]] = None):
+    """
+    Builds the Flask app
+
+    Args:
+        config: dev/prod/test config class
+        namespaces (Optional[Iterable[str]]): names from NAMESPACES to serve, i.e. ['auth', 'stocks'] for a
+            worker that only handles CRUD traffic. Every namespace is served if None
+    """
     app = Flask(__name__)
     
     # create app with the dev/prod/test config
@@ -21,17 +49,47 @@ def create_app(config=config_dict['dev']):
     db.init_app(app=app)
     migrate = Migrate(app=app, db=db)
     
+    # cache optimizer results across requests
+    result_cache.init_app(app=app)
+    
+    # local store for background optimization jobs
+    job_store.init_app(app=app)
+    
+    # resolve the token identity to the current user, cached across requests
+    identity_cache.init_app(app=app)
+    
+    # strategy signals, today's cached across requests
+    signal_store.init_app(app=app)
+    
+    # time every request, served with the stage timings by the monitoring namespace
+    request_metrics.init_app(app=app)
+    
     jwt = JWTManager(app=app)
     
+    @jwt.user_lookup_loader
+    def load_current_user(jwt_header, jwt_data):
+        return identity_cache.load(username=jwt_data[app.config['JWT_IDENTITY_CLAIM']])
+    
     # instantiate restx framework
     api = Api(app=app)
     
     # add namespaces to get access to routes/endpoints
-    api.add_namespace(ns=auth_namespace)
-    api.add_namespace(ns=stocks_namespace)
-    api.add_namespace(ns=strategies_namespace)
-    api.add_namespace(ns=metrics_namespace)
+    for name in (NAMESPACES if namespaces is None else namespaces):
+        module, attribute = NAMESPACES[name]
+        api.add_namespace(ns=getattr(import_module(module, __name__), attribute))
+    
     
+    # run on a schedule, i.e. a daily cron entry calling `flask refresh-tickers`
+    @app.cli.command('refresh-tickers')
+    def refresh_tickers():
+        """
+        Refreshes ticker metadata older than TICKER_INFO_MAX_AGE
+        """
+        refreshed, errors = refresh_ticker_info(max_age=app.config['TICKER_INFO_MAX_AGE'],
+                                                max_workers=app.config['METADATA_LOOKUP_WORKERS'])
+        print(f"Refreshed {refreshed} tickers")
+        for ticker, error in errors.items():
+            print(f"Error refreshing {ticker}: {error}")
     
     @app.shell_context_processor
     def make_shell_context():
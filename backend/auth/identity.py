@@ -0,0 +1,69 @@
+from typing import NamedTuple, Optional
+from flask import Flask
+from sqlalchemy import event, inspect
+from ..models.users import User
+from ..utils import db
+from ..utils.cache import TTLCache
+from ..utils.metrics import timed
+
+
+class UserSnapshot(NamedTuple):
+    """
+    The user columns protected handlers need, safe to share across requests unlike a session bound User
+    """
+    id: int
+    username: str
+    is_paid_member: bool
+
+
+class IdentityCache:
+    """
+    Resolves the username in a JWT to a UserSnapshot, caching the result across requests
+
+    Entries expire after USER_CACHE_TTL and are dropped when the user row is updated or deleted through
+    the ORM. The cache is per process, so other workers see such a change once their entry expires.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the IdentityCache class, sized in init_app
+        """
+        self.cache = TTLCache()
+
+    def init_app(self, app: Flask) -> None:
+        self.cache = TTLCache(max_size=app.config.get('USER_CACHE_SIZE', 4096),
+                              ttl=app.config.get('USER_CACHE_TTL', 300))
+
+    def load(self, username: str) -> Optional[UserSnapshot]:
+        """
+        Returns the snapshot of a user, None if no user has that username
+        """
+        snapshot = self.cache.get(username)
+        if snapshot is not None:
+            return snapshot
+
+        with timed('user_query'):
+            row = db.session.query(User.id, User.username, User.is_paid_member).filter_by(username=username).first()
+        if row is None:
+            return None
+
+        snapshot = UserSnapshot(id=row.id, username=row.username, is_paid_member=bool(row.is_paid_member))
+        self.cache.set(username, snapshot)
+        return snapshot
+
+    def invalidate(self, username: str) -> None:
+        self.cache.delete(username)
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_user(mapper, connection, target: User) -> None:
+    """
+    Drops the cached snapshot of a user that changed, under its old username too if it was renamed
+    """
+    identity_cache.invalidate(target.username)
+    for username in inspect(target).attrs.username.history.deleted:
+        identity_cache.invalidate(username)
@@ -10,6 +10,28 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=30)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(minutes=30)
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+    OPTIMIZER_CACHE_BACKEND = os.getenv('OPTIMIZER_CACHE_BACKEND', 'memory') # 'memory' or 'file'
+    OPTIMIZER_CACHE_DIR = os.getenv('OPTIMIZER_CACHE_DIR', f"{os.getcwd()}/optimizer_cache")
+    OPTIMIZER_CACHE_SIZE = 1024
+    OPTIMIZER_CACHE_TTL = 60 * 60 * 12 # seconds
+    JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', f"{os.getcwd()}/jobs.db")
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', os.cpu_count()))
+    JOB_POLL_INTERVAL = 0.5 # seconds
+    JOB_LEASE = 60 * 10 # seconds a claimed job may run before it is queued again
+    JOB_MAX_ATTEMPTS = 3
+    METADATA_LOOKUP_WORKERS = 8
+    TICKER_INFO_MAX_AGE = timedelta(days=7)
+    BULK_IMPORT_MAX_ROWS = 2000
+    COVARIANCE_DIR = os.getenv('COVARIANCE_DIR', f"{os.getcwd()}/covariance")
+    USER_CACHE_SIZE = 4096
+    USER_CACHE_TTL = 60 * 5 # seconds
+    MONITORING_TOKEN = os.getenv('MONITORING_TOKEN') # bearer token of the monitoring namespace, closed when unset
+    PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'false').lower() in ('1', 'true', 'yes') # sample requests sent with X-Profile: <MONITORING_TOKEN>
+    PROFILE_INTERVAL = 0.005 # seconds
+    PROFILE_HISTORY = 20
+    STRATEGY_SCHEDULE = os.getenv('STRATEGY_SCHEDULE', '12:50') # comma separated local times, i.e. '09:35,12:50'
+    STRATEGY_WORKERS = int(os.getenv('STRATEGY_WORKERS', os.cpu_count()))
+    SIGNAL_CACHE_TTL = 60 # seconds
 
 class DevConfig(Config):
     SQLALCHEMY_ECHO = True
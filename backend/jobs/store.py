@@ -0,0 +1,174 @@
+import json
+from contextlib import closing
+import sqlite3
+import time
+import uuid
+from typing import List, Optional
+from flask import Flask
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobStore:
+    """
+    Local SQLite table of optimization jobs shared by the web workers and the job workers
+
+    Web workers only insert and read rows, job workers claim queued rows one at a time. A running job whose
+    lease expired, its worker having been killed, is queued again or failed once it has used its attempts.
+    Every claim gets a new token and only the worker holding the current one can finish or fail the job.
+    """
+
+    def __init__(self, path: Optional[str] = None, lease: float = 60 * 10, max_attempts: int = 3) -> None:
+        """
+        Constructor for the JobStore class
+
+        @path: SQLite file holding the jobs table, set from the app config in init_app when None
+        @lease: seconds a claimed job may run before it is taken back from its worker
+        @max_attempts: claims of a job before an expired lease fails it instead of queuing it again
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        if self.path is not None:
+            self.create_table()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Points the store at JOB_STORE_PATH from the app config
+        """
+        self.path = app.config['JOB_STORE_PATH']
+        self.lease = app.config.get('JOB_LEASE', self.lease)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.create_table()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def create_table(self) -> None:
+        with closing(self.connect()) as connection:
+            # WAL lets pollers read while a worker writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    method TEXT NOT NULL,
+                    tickers TEXT NOT NULL,
+                    risk_free_rate REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    claim_token TEXT
+                )
+            """)
+            # job files created before leases have no attempts or claim_token column
+            columns = [row['name'] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if 'attempts' not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            if 'claim_token' not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN claim_token TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at ON jobs (status, created_at)")
+
+    def submit(self, user_id: int, method: str, ticker_list: List[str], risk_free_rate: float) -> str:
+        """
+        Queues a job and returns its id
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self.connect()) as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, user_id, method, tickers, risk_free_rate, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, method, json.dumps(ticker_list), risk_free_rate, QUEUED, time.time())
+            )
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """
+        Marks the oldest queued job as running and returns it, None if the queue is empty
+
+        Running jobs whose lease expired are taken back first, queued again or failed after max_attempts claims.
+        The returned job carries the claim_token finish and fail need.
+        """
+        connection = self.connect()
+        try:
+            # take the write lock up front so two workers can never claim the same row
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (FAILED, "The worker stopped before the job finished", now, RUNNING, now - self.lease, self.max_attempts)
+            )
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, claim_token = NULL WHERE status = ? AND started_at < ?",
+                (QUEUED, RUNNING, now - self.lease)
+            )
+
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            claim_token = uuid.uuid4().hex
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, claim_token = ? WHERE id = ?",
+                (RUNNING, now, claim_token, row['id'])
+            )
+            connection.execute("COMMIT")
+            return dict(self.to_dict(row), status=RUNNING, started_at=now, attempts=row['attempts'] + 1,
+                        claim_token=claim_token)
+        except sqlite3.Error:
+            # BEGIN IMMEDIATE itself fails when the lock is not granted, there is then nothing to roll back
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def finish(self, job_id: str, claim_token: str, result: dict) -> bool:
+        """
+        Stores the result of a running job, ignored when the claim is no longer current
+
+        Returns:
+            bool: False if the lease expired and the job was taken back, its result is then dropped
+        """
+        with closing(self.connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ? AND claim_token = ?",
+                (DONE, json.dumps(result), time.time(), job_id, RUNNING, claim_token)
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, claim_token: str, error: str) -> bool:
+        """
+        Stores the error of a running job, ignored when the claim is no longer current, see finish
+        """
+        with closing(self.connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ? AND claim_token = ?",
+                (FAILED, error, time.time(), job_id, RUNNING, claim_token)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.to_dict(row) if row is not None else None
+
+    def to_dict(self, row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job['tickers'] = json.loads(job['tickers'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+
+job_store = JobStore()
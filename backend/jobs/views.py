@@ -0,0 +1,70 @@
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required, current_user
+from flask import request
+from ..models.queries import holding_tickers
+from http import HTTPStatus
+from .store import job_store, DONE, FAILED
+
+jobs_namespace = Namespace('jobs', description="Background optimization jobs namespace")
+
+job_model = jobs_namespace.model(
+    'Job',
+    {
+        'method': fields.String(required=True, description="Optimizer to run", enum=['sharpe', 'sortino'])
+    }
+)
+
+METHODS = ('sharpe', 'sortino')
+
+
+# register route
+@jobs_namespace.route('/')
+class SubmitJob(Resource):
+    
+    # expect job model as input
+    @jobs_namespace.expect(job_model)
+    @jwt_required(refresh=True)
+    def post(self):
+        data = request.get_json()
+        method = data.get('method')
+        
+        if method not in METHODS:
+            return {"message": f"method must be one of {', '.join(METHODS)}"}, HTTPStatus.BAD_REQUEST
+        
+        ticker_list = holding_tickers(current_user.id)
+        if not ticker_list:
+            return {"message": "No holdings to optimize"}, HTTPStatus.NOT_FOUND
+        
+        job_id = job_store.submit(user_id=current_user.id, method=method, ticker_list=ticker_list, risk_free_rate=0.02)
+        
+        return {
+            "id": job_id,
+            "status": "queued",
+            "url": f"{jobs_namespace.path}/{job_id}"
+        }, HTTPStatus.ACCEPTED
+
+
+# register route
+@jobs_namespace.route('/<string:job_id>')
+class GetJob(Resource):
+    
+    @jwt_required(refresh=True)
+    def get(self, job_id):
+        job = job_store.get(job_id)
+        
+        # other users' jobs are reported as missing
+        if job is None or job['user_id'] != current_user.id:
+            return {"message": "Job not found"}, HTTPStatus.NOT_FOUND
+        
+        response = {
+            "id": job['id'],
+            "method": job['method'],
+            "status": job['status']
+        }
+        
+        if job['status'] == DONE:
+            response['result'] = job['result']
+        elif job['status'] == FAILED:
+            response['error'] = job['error']
+        
+        return response, HTTPStatus.OK
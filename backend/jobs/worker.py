@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import sqlite3
+import time
+from typing import Optional
+from ..config.config import config_dict
+from .store import job_store
+
+
+def work(config: type) -> None:
+    """
+    Worker loop, claims queued jobs and runs them until the process is stopped
+
+    Args:
+        config (type): config class the app is created with, must be importable by the child process
+    """
+    # imported here so every worker process builds its own app, engine and connections
+    from .. import create_app
+    from ..optimizer.service import optimize_holdings
+    from ..utils import db
+
+    app = create_app(config=config)
+    poll_interval = app.config['JOB_POLL_INTERVAL']
+
+    with app.app_context():
+        while True:
+            try:
+                job = job_store.claim()
+            except sqlite3.OperationalError as e:
+                # i.e. the job file stayed locked past the connection timeout, try again on the next poll
+                print(f"Error claiming a job: {e}")
+                job = None
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                result = optimize_holdings(method=job['method'],
+                                           ticker_list=job['tickers'],
+                                           risk_free_rate=job['risk_free_rate'])
+                if not job_store.finish(job['id'], job['claim_token'], result):
+                    print(f"Job {job['id']} was taken back after its lease expired, its result is dropped")
+            except Exception as e:
+                db.session.rollback()
+                if job_store.fail(job['id'], job['claim_token'], str(e)):
+                    print(f"Job {job['id']} failed: {e}")
+                else:
+                    print(f"Job {job['id']} was taken back after its lease expired, its error is dropped: {e}")
+            finally:
+                db.session.remove()
+
+
+def run_workers(config: type = config_dict['dev'], processes: Optional[int] = None) -> None:
+    """
+    Starts a pool of worker processes, one per CPU core by default, and waits on them
+
+    Args:
+        config (type): config class the app is created with
+        processes (Optional[int]): number of worker processes, JOB_WORKERS from the config when None
+    """
+    processes = processes or getattr(config, 'JOB_WORKERS', None) or os.cpu_count()
+
+    # spawn so no worker inherits the parent's database connections
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=work, args=(config,), daemon=True) for _ in range(processes)]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,26 @@
+from ..utils import db
+from datetime import datetime
+
+
+class PortfolioMetrics(db.Model):
+    """
+    A class that creates the PortfolioMetrics table schema, optimizer results computed ahead of time
+
+    One row per ticker set, method and risk free rate, shared by every user holding the same tickers.
+    """
+    __tablename__ = 'portfolio_metrics'
+    
+    # define table schema
+    ticker_set = db.Column(db.String(40), primary_key=True)
+    method = db.Column(db.String(16), primary_key=True)
+    risk_free_rate = db.Column(db.Float, primary_key=True)
+    tickers = db.Column(db.Text, nullable=False)  # JSON list, the order of the stored weights
+    data_version = db.Column(db.String(32), nullable=False)
+    result = db.Column(db.Text, nullable=False)  # JSON result as served by the /metrics endpoints
+    computed_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        """
+        Allow for a printable representation of the PortfolioMetrics class
+        """
+        return f"<PortfolioMetrics {self.method} {self.ticker_set}>"
@@ -0,0 +1,37 @@
+from ..utils import db
+
+
+class Price(db.Model):
+    """
+    A class that creates the Price table schema, one daily close per ticker
+    """
+    __tablename__ = 'prices'
+    
+    # define table schema
+    ticker = db.Column(db.String(10), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    close = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self) -> str:
+        """
+        Allow for a printable representation of the Price class
+        """
+        return f"<Price {self.ticker} {self.date}>"
+
+
+class PriceSync(db.Model):
+    """
+    A class that creates the PriceSync table schema, tracks when each ticker's history was last fetched
+    """
+    __tablename__ = 'price_syncs'
+    
+    # define table schema
+    ticker = db.Column(db.String(10), primary_key=True)
+    last_date = db.Column(db.Date, nullable=True)
+    synced_on = db.Column(db.Date, nullable=False)
+    
+    def __repr__(self) -> str:
+        """
+        Allow for a printable representation of the PriceSync class
+        """
+        return f"<PriceSync {self.ticker} {self.synced_on}>"
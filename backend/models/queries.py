@@ -0,0 +1,44 @@
+from typing import Iterator, List, Tuple
+from sqlalchemy import select
+from ..utils import db
+from ..utils.metrics import timed
+from .stocks import Stock
+from .tickers import TickerInfo
+
+# holdings are read in ticker order, which the (user_id, ticker) index returns without a sort
+HOLDING_COLUMNS = (Stock.ticker, TickerInfo.company_name, TickerInfo.sector, TickerInfo.industry,
+                   Stock.quantity, Stock.average_price)
+
+
+@timed('holdings_query')
+def holding_tickers(user_id: int) -> List[str]:
+    """
+    Returns the tickers a user holds, without loading Stock objects
+
+    Args:
+        user_id (int): id of the user
+
+    Returns:
+        List[str]: tickers in alphabetical order
+    """
+    return list(db.session.scalars(select(Stock.ticker).where(Stock.user_id == user_id).order_by(Stock.ticker)))
+
+
+def iter_holdings(user_id: int, batch_size: int = 1000) -> Iterator[Tuple[str, str, str, str, float, float]]:
+    """
+    Streams a user's holdings joined with their ticker metadata as plain tuples
+
+    Args:
+        user_id (int): id of the user
+        batch_size (int): rows fetched from the cursor at a time
+
+    Returns:
+        Iterator[Tuple[str, str, str, str, float, float]]: ticker, company name, sector, industry, quantity and
+        average price of each holding in ticker order
+    """
+    statement = select(*HOLDING_COLUMNS).join(TickerInfo, Stock.ticker == TickerInfo.ticker) \
+        .where(Stock.user_id == user_id).order_by(Stock.ticker) \
+        .execution_options(yield_per=batch_size)
+
+    for row in db.session.execute(statement):
+        yield tuple(row)
@@ -0,0 +1,27 @@
+from ..utils import db
+from datetime import datetime
+
+
+class Signal(db.Model):
+    """
+    A class that creates the Signal table schema, one row per strategy, trading day, ticker and signal
+
+    Every run's signals are kept, so the table is the strategies' history.
+    """
+    __tablename__ = 'signals'
+    # one buy and one sell at most per strategy, day and ticker, also serves date range queries of a strategy
+    __table_args__ = (db.Index('ix_signals_strategy_date_ticker_signal', 'strategy', 'date', 'ticker', 'signal', unique=True),)
+    
+    # define table schema
+    id = db.Column(db.Integer, primary_key=True)
+    strategy = db.Column(db.String(32), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    ticker = db.Column(db.String(10), nullable=False)
+    signal = db.Column(db.String(8), nullable=False, default='buy')
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        """
+        Allow for a printable representation of the Signal class
+        """
+        return f"<Signal {self.strategy} {self.date} {self.ticker}>"
@@ -1,4 +1,5 @@
 from ..utils import db
+from .tickers import TickerInfo
 
 
 class Stock(db.Model):
@@ -7,12 +8,14 @@ class Stock(db.Model):
     """
     __tablename__ = 'stocks'
     
+    # one row per holding, every endpoint looks holdings up by user and ticker
+    __table_args__ = (
+        db.Index('ix_stocks_user_id_ticker', 'user_id', 'ticker', unique=True),
+    )
+    
     # define table schema
     id = db.Column(db.Integer, primary_key=True)
-    ticker = db.Column(db.String(10), nullable=False)
-    company_name = db.Column(db.String(128), nullable=False)
-    sector = db.Column(db.String(128), nullable=False)
-    industry = db.Column(db.String(128), nullable=False)
+    ticker = db.Column(db.String(10), db.ForeignKey('ticker_info.ticker'), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     average_price = db.Column(db.Float, nullable=False)
     
@@ -20,6 +23,21 @@ class Stock(db.Model):
     # foreign key to link to User
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # company metadata is shared by every holder of the ticker
+    info = db.relationship('TickerInfo', lazy='joined')
+    
+    @property
+    def company_name(self) -> str:
+        return self.info.company_name
+    
+    @property
+    def sector(self) -> str:
+        return self.info.sector
+    
+    @property
+    def industry(self) -> str:
+        return self.info.industry
+    
     def __repr__(self) -> str:
         """
         Allow for a printable representation of the Stocks class
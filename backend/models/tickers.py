@@ -0,0 +1,29 @@
+from ..utils import db
+from datetime import datetime
+
+
+class TickerInfo(db.Model):
+    """
+    A class that creates the TickerInfo table schema, company metadata looked up once per symbol
+    """
+    __tablename__ = 'ticker_info'
+    
+    # define table schema
+    ticker = db.Column(db.String(10), primary_key=True)
+    company_name = db.Column(db.String(128), nullable=False, default='')
+    sector = db.Column(db.String(128), nullable=False, default='')
+    industry = db.Column(db.String(128), nullable=False, default='')
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        """
+        Allow for a printable representation of the TickerInfo class
+        """
+        return f"<TickerInfo {self.ticker}>"
+    
+    def save(self):
+        """
+        Save the object to the database table
+        """
+        db.session.add(self)
+        db.session.commit()
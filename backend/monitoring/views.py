@@ -0,0 +1,47 @@
+from typing import Optional, Tuple
+from flask_restx import Namespace, Resource
+from flask import Response, current_app, request
+from http import HTTPStatus
+from ..utils.metrics import is_monitoring_token, registry, request_metrics
+
+monitoring_namespace = Namespace('monitoring', description="Metrics and profiles namespace")
+
+
+def check_monitoring_token() -> Optional[Tuple[dict, HTTPStatus]]:
+    """
+    Monitoring is served to clients sending MONITORING_TOKEN as a bearer token, i.e. a Prometheus agent
+
+    The client address is not trusted, behind a reverse proxy every request comes from the proxy.
+
+    Returns:
+        Optional[Tuple[dict, HTTPStatus]]: the error response, None if the request may be served
+    """
+    if not current_app.config.get('MONITORING_TOKEN'):
+        return {"message": "Monitoring is disabled, MONITORING_TOKEN is not set"}, HTTPStatus.FORBIDDEN
+
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'Bearer' or not is_monitoring_token(token):
+        return {"message": "Monitoring needs the MONITORING_TOKEN bearer token"}, HTTPStatus.UNAUTHORIZED
+    return None
+
+
+@monitoring_namespace.route('/metrics')
+class MetricsEndpoint(Resource):
+
+    def get(self):
+        error = check_monitoring_token()
+        if error is not None:
+            return error
+
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@monitoring_namespace.route('/profiles')
+class ProfilesEndpoint(Resource):
+
+    def get(self):
+        error = check_monitoring_token()
+        if error is not None:
+            return error
+
+        return list(request_metrics.profiles), HTTPStatus.OK
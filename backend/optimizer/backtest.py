@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from .service import optimizer_class
+
+# (closes, dates, tickers) of the shared price panel, set in every pool process by attach_panel
+PANEL = None
+
+
+class RollingMoments:
+    """
+    Sums and cross products of the daily returns in a window, moved by adding the days entering it
+    and subtracting the days leaving it instead of recomputing over the whole window
+    """
+
+    def __init__(self, returns: np.ndarray, refresh_every: int = 50) -> None:
+        """
+        Constructor for the RollingMoments class
+
+        @returns: daily log returns (days x holdings)
+        @refresh_every: moves between full recomputations, bounds the rounding error the updates accumulate
+        @start, end: rows of returns in the window
+        """
+        self.returns = returns
+        self.refresh_every = refresh_every
+        self.start = self.end = 0
+        self.moves = 0
+        self.sums = np.zeros(returns.shape[1])
+        self.products = np.zeros((returns.shape[1], returns.shape[1]))
+
+    def move(self, start: int, end: int) -> None:
+        """
+        Moves the window to the rows [start, end)
+        """
+        self.moves += 1
+        if start >= self.end or self.moves % self.refresh_every == 0:
+            window = self.returns[start:end]
+            self.sums = window.sum(axis=0)
+            self.products = window.T @ window
+        else:
+            added = self.returns[self.end:end]
+            removed = self.returns[self.start:start]
+            self.sums += added.sum(axis=0) - removed.sum(axis=0)
+            self.products += added.T @ added - removed.T @ removed
+        self.start, self.end = start, end
+
+    def mean(self) -> np.ndarray:
+        return self.sums / (self.end - self.start)
+
+    def covariance(self) -> np.ndarray:
+        days = self.end - self.start
+        mean = self.sums / days
+        return (self.products - days * np.outer(mean, mean)) / (days - 1)
+
+
+class WalkForward:
+    """
+    Walk-forward backtest of an optimizer, re-optimized on a rolling or expanding window at every rebalance
+
+    The weights chosen at a rebalance only see the closes before it and are held, drifting with prices, until
+    the next one, so every reported return is out of sample.
+    """
+
+    def __init__(self,
+                 price_data: pd.DataFrame,
+                 method: str = 'sharpe',
+                 lookback: Optional[int] = 252,
+                 rebalance: str = 'M',
+                 risk_free_rate: float = 0.02,
+                 min_window: int = 63,
+                 warm_start: bool = True) -> None:
+        """
+        Constructor for the WalkForward class
+
+        @price_data: closing prices indexed by date with one column per ticker, days missing a close are dropped
+        @method: 'sharpe' or 'sortino'
+        @lookback: trading days in the rolling window, the window expands from the first day if None
+        @rebalance: pandas period frequency of the rebalances, i.e. 'W', 'M', 'Q' or 'Y'
+        @risk_free_rate: yearly risk free rate
+        @min_window: fewest trading days an expanding window starts with
+        @warm_start: start every solve from the previous rebalance's weights
+        """
+        self.price_data = price_data.dropna()
+        self.ticker_list = list(self.price_data.columns)
+        self.method = method
+        self.lookback = lookback
+        self.rebalance = rebalance
+        self.risk_free_rate = risk_free_rate
+        self.min_window = min_window
+        self.warm_start = warm_start
+
+        closes = self.price_data.to_numpy(dtype=np.float64)
+        # returns[i] is the log return from day i to day i + 1
+        self.returns = np.ascontiguousarray(np.log(closes[1:] / closes[:-1]))
+        self.growth = np.exp(self.returns)
+        self.dates = self.price_data.index[1:]
+
+    def rebalance_rows(self) -> np.ndarray:
+        """
+        Rows of returns each holding period starts at, the first trading day of every period with a full window
+        """
+        periods = self.dates.to_period(self.rebalance)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        return starts[starts >= (self.lookback or self.min_window)]
+
+    def run(self) -> dict:
+        """
+        Runs the backtest
+
+        Returns:
+            dict: daily out of sample returns (pd.Series), weights chosen at each rebalance (pd.DataFrame),
+            one-way turnover of each rebalance (pd.Series) and the summary of the run
+        """
+        optimizer = optimizer_class(self.method)(ticker_list=self.ticker_list, price_data=self.price_data)
+        moments = RollingMoments(self.returns)
+        n_holdings = len(self.ticker_list)
+
+        rows = self.rebalance_rows()
+        ends = np.r_[rows[1:], len(self.returns)]
+        portfolio_returns = np.empty(len(self.returns) - rows[0]) if len(rows) else np.empty(0)
+        weights_history = np.empty((len(rows), n_holdings))
+        turnover = np.empty(len(rows))
+        weights = None
+        drifted = np.zeros(n_holdings)
+
+        for index, (row, end) in enumerate(zip(rows, ends)):
+            start = row - self.lookback if self.lookback else 0
+            moments.move(start, row)
+
+            initial_weights = weights if self.warm_start else None
+            if self.method == 'sortino':
+                weights = optimizer.maximize_ratio(mean_returns=moments.mean(),
+                                                   risk_free_rate=self.risk_free_rate,
+                                                   n_holdings=n_holdings,
+                                                   log_returns=self.returns[start:row],
+                                                   initial_weights=initial_weights)[0]
+            else:
+                weights = optimizer.maximize_ratio(mean_returns=pd.Series(moments.mean()),
+                                                   covar_returns=pd.DataFrame(moments.covariance()),
+                                                   risk_free_rate=self.risk_free_rate,
+                                                   n_holdings=n_holdings,
+                                                   initial_weights=initial_weights)[0]
+            # the solver's weights are rounded to 4 decimals
+            weights = weights / weights.sum()
+            weights_history[index] = weights
+            turnover[index] = 0.5 * np.abs(weights - drifted).sum()
+
+            # hold the weights until the next rebalance, each holding grows with its price
+            values = weights * np.cumprod(self.growth[row:end], axis=0)
+            previous = np.r_[1.0, values.sum(axis=1)[:-1]]
+            portfolio_returns[row - rows[0]:end - rows[0]] = values.sum(axis=1) / previous - 1
+            drifted = values[-1] / values[-1].sum()
+
+        returns = pd.Series(portfolio_returns, index=self.dates[rows[0]:] if len(rows) else self.dates[:0])
+        turnover = pd.Series(turnover, index=self.dates[rows])
+        return {
+            'returns': returns,
+            'weights': pd.DataFrame(weights_history, index=self.dates[rows], columns=self.ticker_list),
+            'turnover': turnover,
+            'summary': summarize(returns, turnover, self.risk_free_rate)
+        }
+
+
+def summarize(returns: pd.Series, turnover: pd.Series, risk_free_rate: float = 0.0) -> dict:
+    """
+    Yearly return, volatility, Sharpe ratio, maximum drawdown and turnover of daily out of sample returns
+
+    Args:
+        returns (pd.Series): daily simple returns
+        turnover (pd.Series): one-way turnover of each rebalance, the first one buys the portfolio from cash
+        risk_free_rate (float): yearly risk free rate
+
+    Returns:
+        dict: JSON serializable summary
+    """
+    if len(returns) == 0:
+        return {'Days': 0, 'Rebalances': 0}
+
+    wealth = np.cumprod(1 + returns.to_numpy())
+    yearly_return = wealth[-1] ** (252 / len(wealth)) - 1
+    yearly_volatility = returns.std() * np.sqrt(252)
+    drawdown = 1 - wealth / np.maximum.accumulate(np.r_[1.0, wealth])[1:]
+
+    return {
+        'Days': int(len(returns)),
+        'Rebalances': int(len(turnover)),
+        'Total return': round(float(wealth[-1] - 1), 4),
+        'Yearly returns': round(float(yearly_return), 4),
+        'Yearly volatility': round(float(yearly_volatility), 4),
+        'Sharpe ratio': round(float((yearly_return - risk_free_rate) / yearly_volatility), 4) if yearly_volatility else None,
+        'Max drawdown': round(float(drawdown.max()), 4),
+        'Average turnover': round(float(turnover.iloc[1:].mean()), 4) if len(turnover) > 1 else 0.0
+    }
+
+
+def attach_panel(path: str, dates: np.ndarray, tickers: List[str]) -> None:
+    """
+    Pool initializer, maps the price panel written by the parent read only instead of copying it
+    """
+    global PANEL
+    PANEL = (np.load(path, mmap_mode='r'), pd.DatetimeIndex(dates), tickers)
+
+
+def backtest_parameters(parameters: dict) -> dict:
+    """
+    Runs one backtest of a grid on the shared price panel, returns its parameters and summary
+    """
+    closes, dates, tickers = PANEL
+    price_data = pd.DataFrame(closes, index=dates, columns=tickers)
+    return {**parameters, **WalkForward(price_data, **parameters).run()['summary']}
+
+
+def run_grid(price_data: pd.DataFrame, grid: List[dict], processes: Optional[int] = None) -> List[dict]:
+    """
+    Runs one walk-forward backtest per parameter set in parallel, sharing a single copy of the closes
+
+    Args:
+        price_data (pd.DataFrame): closing prices indexed by date with one column per ticker
+        grid (List[dict]): WalkForward keyword arguments of each backtest, i.e.
+            [{'method': 'sharpe', 'lookback': 252}, {'method': 'sortino', 'lookback': None}]
+        processes (Optional[int]): pool size, one process per CPU core if None
+
+    Returns:
+        List[dict]: parameters and summary of each backtest, in grid order
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'panel.npy')
+        np.save(path, price_data.to_numpy(dtype=np.float64))
+
+        # spawn so no pool process inherits the parent's database connections
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=attach_panel,
+                                 initargs=(path, price_data.index.to_numpy(), list(price_data.columns))) as pool:
+            return list(pool.map(backtest_parameters, grid))
@@ -0,0 +1,175 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from ..config.config import config_dict
+from ..models.metrics import PortfolioMetrics
+from ..models.stocks import Stock
+from ..utils import db
+from ..utils.upsert import upsert
+from .cache import result_cache
+from .covariance import CovarianceService
+from .price_store import PriceStore
+from .service import run_optimizer
+
+# (closes, dates, column of each ticker) of the shared price panel, set in every pool process by attach_panel
+PANEL = None
+
+# co-moments of every held ticker, set in every pool process by attach_panel
+COVARIANCE = None
+
+# ticker sets handed to a pool process at a time, per process
+CHUNKS_PER_PROCESS = 4
+
+# ticker sets written per transaction, so an interrupted run keeps most of its results
+COMMIT_EVERY = 500
+
+
+def attach_panel(path: str, dates: np.ndarray, tickers: List[str], covariance_dir: str) -> None:
+    """
+    Pool initializer, maps the price panel and the co-moments written by the parent read only instead of copying them
+    """
+    global PANEL, COVARIANCE
+    PANEL = (np.load(path, mmap_mode='r'), pd.DatetimeIndex(dates), {ticker: i for i, ticker in enumerate(tickers)})
+    COVARIANCE = CovarianceService.load(covariance_dir, mmap_mode='r')
+
+
+def optimize_ticker_set(ticker_list: List[str],
+                        methods: Sequence[str],
+                        risk_free_rate: float) -> Tuple[List[str], Dict[str, dict], Dict[str, str]]:
+    """
+    Runs every method on one ticker set using the shared price panel
+
+    Returns:
+        Tuple[List[str], Dict[str, dict], Dict[str, str]]: the ticker set, result by method, error by method that failed
+    """
+    closes, dates, columns = PANEL
+    price_data = pd.DataFrame(closes[:, [columns[ticker] for ticker in ticker_list]], index=dates, columns=ticker_list)
+
+    results = {}
+    errors = {}
+    for method in methods:
+        try:
+            results[method] = run_optimizer(method, ticker_list, risk_free_rate, price_data=price_data,
+                                            covariance=COVARIANCE)
+        except Exception as e:
+            errors[method] = str(e)
+    return ticker_list, results, errors
+
+
+def holding_sets() -> List[List[str]]:
+    """
+    Returns every distinct set of tickers held by a user, so users with the same holdings are optimized once
+
+    Returns:
+        List[List[str]]: sorted ticker lists
+    """
+    sets = set()
+    user_id, tickers = None, []
+    for row_user_id, ticker in db.session.query(Stock.user_id, Stock.ticker).order_by(Stock.user_id, Stock.ticker):
+        if row_user_id != user_id:
+            if tickers:
+                sets.add(tuple(tickers))
+            user_id, tickers = row_user_id, []
+        tickers.append(ticker)
+    if tickers:
+        sets.add(tuple(tickers))
+
+    return [list(ticker_set) for ticker_set in sorted(sets)]
+
+
+def store_result(method: str, ticker_list: List[str], risk_free_rate: float, data_version: str, result: dict) -> None:
+    upsert(PortfolioMetrics,
+           values={
+               'ticker_set': result_cache.ticker_set_key(ticker_list),
+               'method': method,
+               'risk_free_rate': risk_free_rate,
+               'tickers': json.dumps(ticker_list),
+               'data_version': data_version,
+               'result': json.dumps(result),
+               'computed_at': datetime.utcnow()
+           },
+           index_elements=['ticker_set', 'method', 'risk_free_rate'],
+           update_columns=['tickers', 'data_version', 'result', 'computed_at'])
+
+
+def run_batch(config: type = config_dict['dev'],
+              methods: Sequence[str] = ('sharpe', 'sortino'),
+              risk_free_rate: float = 0.02,
+              processes: Optional[int] = None,
+              price_store: Optional[PriceStore] = None) -> int:
+    """
+    Optimizes the holdings of every user and stores the results in the portfolio_metrics table
+
+    The closes of every held ticker are synced and loaded once, written to a memory mapped file and
+    shared read only by a pool of processes, one task per distinct ticker set. The co-moments of the held
+    tickers are kept in COVARIANCE_DIR between runs and brought up to date with the new days only.
+
+    Args:
+        config (type): config class the app is created with
+        methods (Sequence[str]): optimizers to run on every ticker set
+        risk_free_rate (float): yearly risk free rate
+        processes (Optional[int]): pool size, JOB_WORKERS from the config when None
+        price_store (Optional[PriceStore]): store to read closes from
+
+    Returns:
+        int: number of results stored
+    """
+    from .. import create_app
+
+    app = create_app(config=config)
+    stored = 0
+
+    with app.app_context():
+        sets = holding_sets()
+        if not sets:
+            return stored
+
+        universe = sorted({ticker for ticker_list in sets for ticker in ticker_list})
+        price_store = price_store if price_store is not None else PriceStore()
+        panel = price_store.load(universe)
+        versions = dict(zip(map(tuple, sets), price_store.versions(sets)))
+
+        # last night's co-moments only need the new days, tickers nobody holds anymore are dropped
+        covariance_dir = app.config['COVARIANCE_DIR']
+        if os.path.exists(os.path.join(covariance_dir, 'universe.json')):
+            covariance = CovarianceService.load(covariance_dir)
+            covariance.retain(universe)
+        else:
+            covariance = CovarianceService()
+        covariance.update(panel)
+        covariance.save(covariance_dir)
+
+        processes = processes or app.config['JOB_WORKERS'] or os.cpu_count()
+        chunksize = max(1, len(sets) // (processes * CHUNKS_PER_PROCESS))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'panel.npy')
+            np.save(path, panel.to_numpy(dtype=np.float64))
+
+            # spawn so no pool process inherits the parent's database connections
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=attach_panel,
+                                     initargs=(path, panel.index.to_numpy(), list(panel.columns), covariance_dir)) as pool:
+                task = partial(optimize_ticker_set, methods=methods, risk_free_rate=risk_free_rate)
+
+                for index, (ticker_list, results, errors) in enumerate(pool.map(task, sets, chunksize=chunksize), start=1):
+                    for method, result in results.items():
+                        store_result(method, ticker_list, risk_free_rate, versions[tuple(ticker_list)], result)
+                    for method, error in errors.items():
+                        print(f"Error optimizing {method} for {', '.join(ticker_list)}: {error}")
+
+                    stored += len(results)
+                    if index % COMMIT_EVERY == 0:
+                        db.session.commit()
+
+        db.session.commit()
+
+    return stored
@@ -0,0 +1,79 @@
+import hashlib
+from typing import List, Optional
+from flask import Flask
+from ..utils.cache import FileCache, TTLCache
+
+
+def reorder_weights(result: dict, tickers: List[str], ticker_list: List[str]) -> dict:
+    """
+    Copies a result whose weights are in tickers order with its weights in ticker_list order instead
+    """
+    weights = dict(zip(tickers, result['Optimized weights']))
+    result = dict(result)
+    result['Optimized weights'] = [weights[ticker] for ticker in ticker_list]
+    return result
+
+
+class ResultCache:
+    """
+    Caches optimizer results keyed by the sorted ticker set, the risk free rate, the method and the price data version
+
+    Results are shared by every user holding the same tickers. The weights are stored together with the
+    ticker order they were computed in and handed back in the caller's order. Editing holdings changes the
+    ticker set and new closes change the data version, so an entry is never stale and only expires.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the ResultCache class, the backend is picked in init_app
+        """
+        self.backend = TTLCache()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Picks the cache backend from the app config
+
+        OPTIMIZER_CACHE_BACKEND: 'memory' for a per-process cache, 'file' for one shared by all workers on the host
+        """
+        max_size = app.config.get('OPTIMIZER_CACHE_SIZE', 1024)
+        ttl = app.config.get('OPTIMIZER_CACHE_TTL', 3600)
+
+        if app.config.get('OPTIMIZER_CACHE_BACKEND', 'memory') == 'file':
+            self.backend = FileCache(directory=app.config['OPTIMIZER_CACHE_DIR'], max_size=max_size, ttl=ttl)
+        else:
+            self.backend = TTLCache(max_size=max_size, ttl=ttl)
+
+    def ticker_set_key(self, ticker_list: List[str]) -> str:
+        """
+        Order independent key for a set of tickers, used as the prefix of every entry for that set
+        """
+        return hashlib.sha1(','.join(sorted(set(ticker_list))).encode()).hexdigest()
+
+    def key(self, method: str, ticker_list: List[str], risk_free_rate: float, data_version: str) -> str:
+        return f"{self.ticker_set_key(ticker_list)}:{method}:{risk_free_rate!r}:{data_version}"
+
+    def get(self, method: str, ticker_list: List[str], risk_free_rate: float, data_version: str) -> Optional[dict]:
+        """
+        Returns the cached result with its weights in ticker_list order, None on a miss
+        """
+        entry = self.backend.get(self.key(method, ticker_list, risk_free_rate, data_version))
+        if entry is None:
+            return None
+
+        return reorder_weights(entry['result'], entry['tickers'], ticker_list)
+
+    def set(self, method: str, ticker_list: List[str], risk_free_rate: float, data_version: str, result: dict) -> None:
+        """
+        Stores a JSON serializable result whose weights are in ticker_list order
+        """
+        self.backend.set(self.key(method, ticker_list, risk_free_rate, data_version),
+                         {'tickers': list(ticker_list), 'result': result})
+
+    def invalidate(self, ticker_list: List[str]) -> None:
+        """
+        Drops every cached result for a ticker set, whatever the method, rate or data version
+        """
+        self.backend.delete_prefix(self.ticker_set_key(ticker_list))
+
+
+result_cache = ResultCache()
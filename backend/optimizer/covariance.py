@@ -0,0 +1,252 @@
+import json
+import os
+from datetime import date
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+def log_returns(closes: np.ndarray, previous: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Log return of every close against the same ticker's previous observed close
+
+    Args:
+        closes (np.ndarray): closes (days x tickers), NaN on days a ticker has no close
+        previous (np.ndarray): last observed close of each ticker before the first day, NaN if there is none
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: returns (days x tickers), NaN where there is no close or no previous close,
+        and the previous observed close each return was taken against
+    """
+    before = pd.DataFrame(np.vstack([previous, closes])).ffill().to_numpy()[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.log(closes / before), before
+
+
+def comoments(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairwise co-moments of two blocks of returns over the days both tickers of a pair have a return
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: for every pair (i in a, j in b) the number of shared days,
+        the sum of a_i over those days and the sum of a_i * b_j
+    """
+    observed_a, observed_b = ~np.isnan(a), ~np.isnan(b)
+    a, b = np.where(observed_a, a, 0.0), np.where(observed_b, b, 0.0)
+    observed_a, observed_b = observed_a.astype(np.float64), observed_b.astype(np.float64)
+    return observed_a.T @ observed_b, a.T @ observed_b, a.T @ b
+
+
+class CovarianceService:
+    """
+    Running pairwise co-moments of daily log returns over a universe of tickers
+
+    Holds, for every pair of tickers, the number of days both have a return, the sum of each one's returns over
+    those days and the sum of their products. Any portfolio's mean returns and covariance matrix are then a slice
+    of these matrices, and a new trading day is added with one outer product instead of a pass over the history.
+
+    Returns are taken against each ticker's own previous close, so a ticker missing a day does not cut the
+    history of the others. The last day is kept apart so a sync that restates it (see PriceStore) replaces it.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the CovarianceService class, starts with an empty universe
+
+        @tickers: universe, in the order of the matrix rows and columns
+        @count, sums, products: pairwise co-moments, sums[i, j] sums the returns of i over the days shared with j
+        @last_date: last day added
+        @last_returns: returns of the last day, subtracted again if that day is restated
+        @close_before: close each last day return was taken against
+        @last_close: last observed close of each ticker
+        """
+        self.tickers: List[str] = []
+        self.index = {}
+        self.count = np.zeros((0, 0))
+        self.sums = np.zeros((0, 0))
+        self.products = np.zeros((0, 0))
+        self.last_date: Optional[date] = None
+        self.last_returns = np.zeros(0)
+        self.close_before = np.zeros(0)
+        self.last_close = np.zeros(0)
+
+    def update(self, price_data: pd.DataFrame) -> None:
+        """
+        Adds the days of price_data after the last day added, and any ticker not in the universe yet
+
+        Tickers already in the universe only read the days from the last day added on, that day being replaced.
+        New tickers read the full history in price_data, which must then hold every ticker of the universe.
+
+        Args:
+            price_data (pd.DataFrame): closing prices indexed by date with one column per ticker
+
+        Raises:
+            ValueError: if price_data is missing tickers of the universe or ends before the last day added
+        """
+        missing = [ticker for ticker in self.tickers if ticker not in price_data.columns]
+        if missing:
+            raise ValueError(f"price_data is missing {', '.join(missing)}")
+        if len(price_data) == 0:
+            return
+
+        dates = pd.DatetimeIndex(price_data.index)
+        if self.last_date is not None and dates[-1].date() < self.last_date:
+            raise ValueError(f"price_data ends before {self.last_date}")
+
+        known = len(self.tickers)
+        new = [ticker for ticker in price_data.columns if ticker not in self.index]
+        self.grow(new)
+        closes = price_data[self.tickers].to_numpy(dtype=np.float64)
+
+        if new:
+            # new tickers against the whole universe, over the full history
+            returns, before = log_returns(closes, np.full(len(self.tickers), np.nan))
+            columns = slice(known, None)
+            count, sums, products = comoments(returns[:, columns], returns)
+            self.count[columns, :], self.count[:, columns] = count, count.T
+            self.sums[columns, :], self.sums[:, columns] = sums, comoments(returns, returns[:, columns])[1]
+            self.products[columns, :], self.products[:, columns] = products, products.T
+            self.set_last_day(columns, returns[-1, columns], before[-1, columns], closes[-1, columns])
+
+        if known:
+            # tickers already in the universe, from the last day added on
+            columns = slice(None, known)
+            rows = dates.date >= self.last_date
+            previous = self.last_close[columns]
+
+            if rows.any() and dates[rows][0].date() == self.last_date:
+                last_returns = self.last_returns[None, columns]
+                count, sums, products = comoments(last_returns, last_returns)
+                self.count[columns, columns] -= count
+                self.sums[columns, columns] -= sums
+                self.products[columns, columns] -= products
+                previous = self.close_before[columns]
+
+            returns, before = log_returns(closes[rows, columns], previous)
+            count, sums, products = comoments(returns, returns)
+            self.count[columns, columns] += count
+            self.sums[columns, columns] += sums
+            self.products[columns, columns] += products
+            self.set_last_day(columns, returns[-1], before[-1], closes[rows, columns][-1])
+
+        self.last_date = dates[-1].date()
+
+    def grow(self, tickers: List[str]) -> None:
+        """
+        Adds rows and columns of zeros for tickers new to the universe
+        """
+        self.tickers.extend(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        size = len(self.tickers)
+        pad = size - len(self.last_close)
+
+        self.count = np.pad(self.count, ((0, pad), (0, pad)))
+        self.sums = np.pad(self.sums, ((0, pad), (0, pad)))
+        self.products = np.pad(self.products, ((0, pad), (0, pad)))
+        self.last_returns = np.pad(self.last_returns, (0, pad), constant_values=np.nan)
+        self.close_before = np.pad(self.close_before, (0, pad), constant_values=np.nan)
+        self.last_close = np.pad(self.last_close, (0, pad), constant_values=np.nan)
+
+    def set_last_day(self, columns: slice, returns: np.ndarray, before: np.ndarray, closes: np.ndarray) -> None:
+        self.last_returns[columns] = returns
+        self.close_before[columns] = before
+        self.last_close[columns] = np.where(np.isnan(closes), before, closes)
+
+    def retain(self, ticker_list: List[str]) -> None:
+        """
+        Drops every ticker of the universe that is not in ticker_list
+        """
+        retained = set(ticker_list)
+        keep = [i for i, ticker in enumerate(self.tickers) if ticker in retained]
+        self.tickers = [self.tickers[i] for i in keep]
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.count = self.count[np.ix_(keep, keep)]
+        self.sums = self.sums[np.ix_(keep, keep)]
+        self.products = self.products[np.ix_(keep, keep)]
+        self.last_returns = self.last_returns[keep]
+        self.close_before = self.close_before[keep]
+        self.last_close = self.last_close[keep]
+
+    def covariance(self, ticker_list: List[str]) -> np.ndarray:
+        """
+        Pairwise covariance matrix of daily log returns, each pair over the days both tickers have a return
+
+        Args:
+            ticker_list (List[str]): tickers of the universe, the matrix is in this order
+
+        Returns:
+            np.ndarray: covariance matrix (tickers x tickers), NaN for pairs with fewer than two shared days
+        """
+        positions = [self.index[ticker] for ticker in ticker_list]
+        idx = np.ix_(positions, positions)
+        count, sums, products = self.count[idx], self.sums[idx], self.products[idx]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, (products - sums * sums.T / count) / (count - 1), np.nan)
+
+    def moments(self, ticker_list: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Mean daily log returns and covariance matrix of a portfolio whose tickers share the same days
+
+        The values equal log_returns.mean() and log_returns.cov() over the portfolio's own closes. Tickers
+        covering different days would give a pairwise matrix that may not be positive semi-definite, so None is
+        returned and the caller computes the moments over the days all tickers share instead.
+
+        Args:
+            ticker_list (List[str]): tickers of the universe
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: mean returns and covariance matrix in ticker_list order
+        """
+        if any(ticker not in self.index for ticker in ticker_list):
+            return None
+
+        idx = [self.index[ticker] for ticker in ticker_list]
+        count = self.count[np.ix_(idx, idx)]
+        days = count[0, 0] if len(idx) else 0
+        if days < 2 or not np.all(count == days):
+            return None
+
+        mean_returns = np.diag(self.sums[np.ix_(idx, idx)]) / days
+        covariance = (self.products[np.ix_(idx, idx)] - days * np.outer(mean_returns, mean_returns)) / (days - 1)
+        return mean_returns, covariance
+
+    def save(self, directory: str) -> None:
+        """
+        Writes the state as .npy files that load can memory map
+
+        Every file is written next to its final name and renamed over it, so processes mapping the previous
+        state keep reading it until they load again. universe.json is replaced last.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {'count.npy': self.count,
+                  'sums.npy': self.sums,
+                  'products.npy': self.products,
+                  'last_day.npy': np.vstack([self.last_returns, self.close_before, self.last_close])}
+        for name, array in arrays.items():
+            with open(os.path.join(directory, f"{name}.tmp"), 'wb') as f:
+                np.save(f, array)
+            os.replace(os.path.join(directory, f"{name}.tmp"), os.path.join(directory, name))
+
+        with open(os.path.join(directory, 'universe.json.tmp'), 'w') as f:
+            json.dump({'tickers': self.tickers,
+                       'last_date': self.last_date.isoformat() if self.last_date is not None else None}, f)
+        os.replace(os.path.join(directory, 'universe.json.tmp'), os.path.join(directory, 'universe.json'))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None) -> 'CovarianceService':
+        """
+        Reads a state written by save, mmap_mode='r' shares the matrices read only between processes
+        """
+        service = cls()
+        with open(os.path.join(directory, 'universe.json')) as f:
+            universe = json.load(f)
+
+        service.tickers = universe['tickers']
+        service.index = {ticker: i for i, ticker in enumerate(service.tickers)}
+        service.last_date = date.fromisoformat(universe['last_date']) if universe['last_date'] else None
+        service.count = np.load(os.path.join(directory, 'count.npy'), mmap_mode=mmap_mode)
+        service.sums = np.load(os.path.join(directory, 'sums.npy'), mmap_mode=mmap_mode)
+        service.products = np.load(os.path.join(directory, 'products.npy'), mmap_mode=mmap_mode)
+        service.last_returns, service.close_before, service.last_close = np.load(os.path.join(directory, 'last_day.npy'))
+        return service
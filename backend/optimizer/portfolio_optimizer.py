@@ -1,16 +1,69 @@
 from abc import ABC, abstractmethod
-from typing import List
-import yfinance as yf
+from typing import Callable, List, Optional, Tuple
+import numpy as np
 import pandas as pd
+from scipy import optimize
+from .covariance import CovarianceService
+from .price_store import PriceStore
+from .simulation import simulate_portfolios
 
 class PortfolioOptimizer(ABC):
     
     def __init__(self,
-                 ticker_list: List[str]) -> None:
+                 ticker_list: List[str],
+                 price_store: Optional[PriceStore] = None,
+                 price_data: Optional[pd.DataFrame] = None,
+                 check_gradients: bool = False,
+                 covariance: Optional[CovarianceService] = None) -> None:
         
         self.ticker_list = ticker_list
+        self.check_gradients = check_gradients
+        # shared co-moments over a universe of tickers, optimizers that use a covariance matrix slice it from here
+        self.covariance = covariance
+        self.price_store = price_store if price_store is not None else PriceStore()
     
-        self.price_data = yf.download(tickers=self.ticker_list, period="max")['Close'].dropna()
+        # callers that already hold the closes (batch jobs, benchmarks) can skip the store
+        if price_data is None:
+            price_data = self.price_store.load(self.ticker_list)
+        self.price_data = price_data[self.ticker_list].dropna()
+    
+    def check_gradient(self,
+                       fun: Callable[..., float],
+                       jac: Callable[..., np.ndarray],
+                       weights: np.ndarray,
+                       args: tuple,
+                       tolerance: float = 1e-4) -> float:
+        """
+        Compares an analytic gradient against a finite difference estimate
+        
+        Args:
+            fun (Callable): objective passed to SLSQP
+            jac (Callable): analytic gradient of the objective
+            weights (np.ndarray): point to check the gradient at
+            args (tuple): extra arguments for fun and jac
+            tolerance (float): largest relative error accepted
+        
+        Returns:
+            float: relative error between the two gradients
+        """
+        gradient_norm = max(np.linalg.norm(jac(weights, *args)), 1.0)
+        error = optimize.check_grad(fun, jac, weights, *args) / gradient_norm
+        
+        if error > tolerance:
+            raise ValueError(f"Analytic gradient of {fun.__name__} is off by {error:.2e} (tolerance {tolerance:.0e})")
+        return error
+    
+    def simulate(self,
+                 n_portfolios: int = 100_000,
+                 risk_free_rate: float = 0.0,
+                 dtype: type = np.float64,
+                 seed: Optional[int] = None) -> dict:
+        """
+        Scores random portfolios of the holdings over the same log returns the optimizers use, see simulate_portfolios
+        """
+        log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
+        return simulate_portfolios(log_returns.to_numpy(), n_portfolios=n_portfolios, risk_free_rate=risk_free_rate,
+                                   dtype=dtype, seed=seed)
     
     @abstractmethod
     def optimize_portfolio(self,
@@ -19,11 +72,21 @@ class PortfolioOptimizer(ABC):
     
     @abstractmethod
     def maximize_ratio(self,
-                       mean_returns: pd.DataFrame,
-                       covar_returns: pd.DataFrame,
+                       mean_returns: pd.Series,
+                       risk: pd.DataFrame,
                        risk_free_rate: float,
-                       n_holdings: int):
+                       n_holdings: int,
+                       initial_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, float, float]:
+        """
+        Solves for the weights with the highest ratio
+        
+        risk is what the ratio's denominator is computed from: the covariance matrix of the daily log returns for
+        Sharpe (covar_returns), the daily log returns themselves (days x holdings) for Sortino (log_returns)
+        
+        Returns:
+            Tuple[np.ndarray, float, float, float]: weights, yearly return, yearly risk and ratio
+        """
         pass
                        
         
-        
\ No newline at end of file
+        
@@ -0,0 +1,203 @@
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from sqlalchemy import func, insert
+from ..models.prices import Price, PriceSync
+from ..utils import db
+from ..utils.metrics import timed
+
+# a fetcher takes a list of tickers and an optional start date and returns daily closes (dates x tickers)
+Fetcher = Callable[[List[str], Optional[date]], pd.DataFrame]
+
+
+@timed('price_download')
+def yahoo_fetcher(ticker_list: List[str], start: Optional[date] = None) -> pd.DataFrame:
+    """
+    Downloads daily closes from Yahoo Finance
+
+    Args:
+        ticker_list (List[str]): tickers to download
+        start (Optional[date]): first day to download, the full history is downloaded if None
+
+    Returns:
+        pd.DataFrame: closing prices indexed by date with one column per ticker
+    """
+    import yfinance as yf
+    if start is None:
+        data = yf.download(tickers=ticker_list, period="max")
+    else:
+        data = yf.download(tickers=ticker_list, start=start)
+
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=ticker_list[0])
+    return closes
+
+
+def frame_fetcher(price_data: pd.DataFrame) -> Fetcher:
+    """
+    Builds a fetcher that serves closes from a local dataframe, i.e. a fixture or synthetic data
+
+    Args:
+        price_data (pd.DataFrame): closing prices indexed by date with one column per ticker
+
+    Returns:
+        Fetcher: a fetcher with the same signature as yahoo_fetcher
+    """
+    def fetch(ticker_list: List[str], start: Optional[date] = None) -> pd.DataFrame:
+        closes = price_data.reindex(columns=ticker_list)
+        if start is not None:
+            closes = closes[closes.index >= pd.Timestamp(start)]
+        return closes
+
+    return fetch
+
+
+class PriceStore:
+    """
+    Keeps daily closes in the prices table and only fetches the days missing since the last sync
+
+    A ticker is fetched at most once per day. The last stored day is always fetched again so a
+    partial (intraday) close from the previous sync gets overwritten by the final one. A ticker the
+    fetcher returns no closes for keeps what is stored and is fetched again on the next sync.
+    """
+
+    def __init__(self, fetcher: Fetcher = yahoo_fetcher) -> None:
+        """
+        Constructor for the PriceStore class
+
+        @fetcher: callable used to download closes that are missing from the table
+        """
+        self.fetcher = fetcher
+
+    def sync(self, ticker_list: List[str]) -> None:
+        """
+        Fetches the days missing from the prices table for each ticker
+
+        Args:
+            ticker_list (List[str]): tickers to bring up to date
+        """
+        today = date.today()
+        syncs = {sync.ticker: sync for sync in PriceSync.query.filter(PriceSync.ticker.in_(ticker_list)).all()}
+
+        # group stale tickers by the first day they need so each group is a single download
+        stale: Dict[Optional[date], List[str]] = defaultdict(list)
+        for ticker in dict.fromkeys(ticker_list):
+            sync = syncs.get(ticker)
+            if sync is None:
+                stale[None].append(ticker)
+            elif sync.synced_on < today:
+                stale[sync.last_date].append(ticker)
+
+        if not stale:
+            return
+
+        for start, tickers in stale.items():
+            closes = self.fetcher(tickers, start)
+
+            # a ticker the fetcher returned nothing for keeps its stored closes and is fetched again next sync
+            columns = {ticker: closes[ticker].dropna() for ticker in tickers if ticker in closes.columns}
+            fetched = [ticker for ticker, column in columns.items() if len(column)]
+            for ticker in tickers:
+                if ticker not in fetched:
+                    print(f"No closes returned for {ticker}, it is fetched again on the next sync")
+            if not fetched:
+                continue
+
+            if start is not None:
+                Price.query.filter(Price.ticker.in_(fetched), Price.date >= start).delete(synchronize_session=False)
+
+            rows = []
+            for ticker in fetched:
+                column = columns[ticker]
+                rows.extend({'ticker': ticker, 'date': day.date(), 'close': float(close)}
+                            for day, close in column.items())
+
+                last_date = column.index[-1].date()
+                if ticker in syncs:
+                    syncs[ticker].last_date = last_date
+                    syncs[ticker].synced_on = today
+                else:
+                    db.session.add(PriceSync(ticker=ticker, last_date=last_date, synced_on=today))
+
+            db.session.execute(insert(Price), rows)
+
+        db.session.commit()
+
+    def version(self, ticker_list: List[str]) -> str:
+        """
+        Identifies the stored data for a list of tickers, changes whenever a sync adds a new day
+
+        Args:
+            ticker_list (List[str]): tickers to identify
+
+        Returns:
+            str: the earliest and latest last stored day across the tickers
+        """
+        first, last = db.session.query(func.min(PriceSync.last_date), func.max(PriceSync.last_date)) \
+            .filter(PriceSync.ticker.in_(ticker_list)).one()
+        return f"{first}:{last}"
+
+    def current_version(self, ticker_list: List[str]) -> Optional[str]:
+        """
+        Same as version in a single query, when every ticker was already synced today
+
+        Lets a cached result be served without running a sync first.
+
+        Args:
+            ticker_list (List[str]): tickers to identify
+
+        Returns:
+            Optional[str]: the version, None if any ticker is due a sync
+        """
+        rows = db.session.query(PriceSync.last_date, PriceSync.synced_on).filter(PriceSync.ticker.in_(ticker_list)).all()
+        if len(rows) < len(set(ticker_list)) or any(synced_on < date.today() for _, synced_on in rows):
+            return None
+
+        dates = [last_date for last_date, _ in rows if last_date is not None]
+        return f"{min(dates)}:{max(dates)}" if dates else "None:None"
+
+    def versions(self, ticker_sets: List[List[str]]) -> List[str]:
+        """
+        Same as version for many ticker sets at once, with a single query
+
+        Args:
+            ticker_sets (List[List[str]]): lists of tickers to identify
+
+        Returns:
+            List[str]: the version of each ticker set, in ticker_sets order
+        """
+        universe = sorted({ticker for ticker_list in ticker_sets for ticker in ticker_list})
+        last_dates = dict(db.session.query(PriceSync.ticker, PriceSync.last_date).filter(PriceSync.ticker.in_(universe)))
+
+        versions = []
+        for ticker_list in ticker_sets:
+            dates = [last_dates[ticker] for ticker in ticker_list if last_dates.get(ticker) is not None]
+            versions.append(f"{min(dates)}:{max(dates)}" if dates else "None:None")
+        return versions
+
+    @timed('price_load')
+    def load(self, ticker_list: List[str]) -> pd.DataFrame:
+        """
+        Syncs and reads the closing prices for a list of tickers
+
+        Args:
+            ticker_list (List[str]): tickers to read
+
+        Returns:
+            pd.DataFrame: closing prices indexed by date with one column per ticker, in ticker_list order
+        """
+        self.sync(ticker_list)
+        return self.read(ticker_list)
+
+    def read(self, ticker_list: List[str]) -> pd.DataFrame:
+        """
+        Reads the stored closing prices for a list of tickers without syncing them, see load
+        """
+        rows = db.session.query(Price.date, Price.ticker, Price.close).filter(Price.ticker.in_(ticker_list)).all()
+        price_data = pd.DataFrame(rows, columns=['Date', 'Ticker', 'Close'])
+        price_data['Date'] = pd.to_datetime(price_data['Date'])
+        price_data = price_data.pivot(index='Date', columns='Ticker', values='Close')
+
+        return price_data.reindex(columns=ticker_list).sort_index()
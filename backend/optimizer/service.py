@@ -0,0 +1,176 @@
+from importlib import import_module
+import json
+import os
+from typing import TYPE_CHECKING, List, Optional, Type
+from flask import current_app
+from .cache import reorder_weights, result_cache
+from ..models.metrics import PortfolioMetrics
+from ..utils import db
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .covariance import CovarianceService
+    from .portfolio_optimizer import PortfolioOptimizer
+    from .price_store import PriceStore
+
+# optimizers are imported on first use so pandas, scipy and yfinance stay out of app startup
+OPTIMIZERS = {
+    'sharpe': ('.sharpe', 'Sharpe'),
+    'sortino': ('.sortino', 'Sortino')
+}
+
+RATIO_NAMES = {
+    'sharpe': 'Sharpe ratio',
+    'sortino': 'Sortino ratio'
+}
+
+# (modified time of universe.json, service) of the co-moments the nightly batch saved, set by shared_covariance
+SHARED_COVARIANCE = None
+
+
+def optimizer_class(method: str) -> Type['PortfolioOptimizer']:
+    """
+    Imports and returns the optimizer class of a method
+    """
+    module, name = OPTIMIZERS[method]
+    return getattr(import_module(module, __package__), name)
+
+
+def shared_covariance() -> Optional['CovarianceService']:
+    """
+    Returns the co-moments the nightly batch saved in COVARIANCE_DIR, None if it has not run yet
+
+    The matrices are memory mapped once per process and mapped again only after the batch saves a new state.
+    """
+    global SHARED_COVARIANCE
+    path = os.path.join(current_app.config['COVARIANCE_DIR'], 'universe.json')
+    if not os.path.exists(path):
+        return None
+
+    modified = os.path.getmtime(path)
+    if SHARED_COVARIANCE is None or SHARED_COVARIANCE[0] != modified:
+        from .covariance import CovarianceService
+        SHARED_COVARIANCE = (modified, CovarianceService.load(os.path.dirname(path), mmap_mode='r'))
+    return SHARED_COVARIANCE[1]
+
+
+def run_optimizer(method: str,
+                  ticker_list: List[str],
+                  risk_free_rate: float,
+                  price_store: Optional['PriceStore'] = None,
+                  price_data: Optional['pd.DataFrame'] = None,
+                  covariance: Optional['CovarianceService'] = None) -> dict:
+    """
+    Runs an optimizer without any caching
+
+    Args:
+        method (str): 'sharpe' or 'sortino'
+        ticker_list (List[str]): tickers held, the weights come back in this order
+        risk_free_rate (float): yearly risk free rate
+        price_store (Optional[PriceStore]): store to read closes from
+        price_data (Optional[pd.DataFrame]): closes already loaded, the store is not read if given
+        covariance (Optional[CovarianceService]): shared co-moments the covariance matrix is sliced from
+
+    Returns:
+        dict: JSON serializable weights, yearly return, yearly volatility and ratio
+    """
+    optimizer = optimizer_class(method)(ticker_list=ticker_list, price_store=price_store, price_data=price_data,
+                                         covariance=covariance)
+    weights, yearly_returns, yearly_volatility, ratio = optimizer.optimize_portfolio(risk_free_rate=risk_free_rate)
+
+    # Convert numpy values to builtins so the result can be cached and returned as JSON
+    return {
+        "Optimized weights": weights.tolist(),
+        "Yearly returns": float(yearly_returns),
+        "Yearly volatility": float(yearly_volatility),
+        RATIO_NAMES[method]: float(ratio)
+    }
+
+
+def stored_result(method: str, ticker_list: List[str], risk_free_rate: float, data_version: str) -> Optional[dict]:
+    """
+    Returns the result the nightly batch stored for a ticker set, None if there is none for this data version
+
+    Args:
+        method (str): 'sharpe' or 'sortino'
+        ticker_list (List[str]): tickers held, the weights come back in this order
+        risk_free_rate (float): yearly risk free rate
+        data_version (str): PriceStore.version of the tickers
+
+    Returns:
+        Optional[dict]: the stored result with its weights in ticker_list order
+    """
+    row = db.session.get(PortfolioMetrics, (result_cache.ticker_set_key(ticker_list), method, risk_free_rate))
+    if row is None or row.data_version != data_version:
+        return None
+    return reorder_weights(json.loads(row.result), json.loads(row.tickers), ticker_list)
+
+
+def cached_result(method: str, ticker_list: List[str], risk_free_rate: float, data_version: str) -> Optional[dict]:
+    """
+    Returns a result already computed for a ticker set, from the result cache or the nightly batch, without solving
+
+    Args:
+        method (str): 'sharpe' or 'sortino'
+        ticker_list (List[str]): tickers held, the weights come back in this order
+        risk_free_rate (float): yearly risk free rate
+        data_version (str): PriceStore.version of the tickers
+
+    Returns:
+        Optional[dict]: the result, None if it has not been computed for this data version
+    """
+    result = result_cache.get(method, ticker_list, risk_free_rate, data_version)
+    if result is not None:
+        return result
+
+    # computed overnight by the batch optimizer
+    result = stored_result(method, ticker_list, risk_free_rate, data_version)
+    if result is not None:
+        result_cache.set(method, ticker_list, risk_free_rate, data_version, result)
+    return result
+
+
+def optimize_holdings(method: str,
+                      ticker_list: List[str],
+                      risk_free_rate: float = 0.02,
+                      price_store: Optional['PriceStore'] = None,
+                      covariance: Optional['CovarianceService'] = None) -> dict:
+    """
+    Optimizes a list of holdings, serving repeats from the result cache and the nightly batch results
+
+    Args:
+        method (str): 'sharpe' or 'sortino'
+        ticker_list (List[str]): tickers held, the weights come back in this order
+        risk_free_rate (float): yearly risk free rate
+        price_store (Optional[PriceStore]): store to read closes from
+        covariance (Optional[CovarianceService]): shared co-moments, the ones in COVARIANCE_DIR if None
+
+    Returns:
+        dict: JSON serializable weights, yearly return, yearly volatility and ratio
+
+    Raises:
+        ValueError: if ticker_list is empty
+    """
+    if not ticker_list:
+        raise ValueError("No holdings to optimize")
+    if price_store is None:
+        from .price_store import PriceStore
+        price_store = PriceStore()
+
+    # tickers already synced today are current, so a repeat is served without a sync
+    data_version = price_store.current_version(ticker_list)
+    if data_version is None:
+        price_store.sync(ticker_list)
+        data_version = price_store.version(ticker_list)
+
+    result = cached_result(method, ticker_list, risk_free_rate, data_version)
+    if result is not None:
+        return result
+
+    if covariance is None:
+        covariance = shared_covariance()
+    # the closes were synced above, they are read as they are rather than loaded through a second sync
+    result = run_optimizer(method, ticker_list, risk_free_rate, price_store=price_store,
+                           price_data=price_store.read(ticker_list), covariance=covariance)
+    result_cache.set(method, ticker_list, risk_free_rate, data_version, result)
+    return result
@@ -1,8 +1,9 @@
 import pandas as pd
 from .portfolio_optimizer import PortfolioOptimizer
 from scipy import optimize
-from typing import Tuple
+from typing import Optional, Tuple
 import numpy as np
+from ..utils.metrics import timed
 
 class Sharpe(PortfolioOptimizer):
     """
@@ -24,10 +25,23 @@ class Sharpe(PortfolioOptimizer):
         1. Find log returns
         2. Find mean of log returns
         3. Compute covariance matrix
+        
+        The mean and covariance are sliced from the shared covariance service when one is set, covers the tickers
+        and ends on the same day as the closes
         """
-        log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
-        mean_returns = log_returns.mean()
-        covariance = log_returns.cov()
+        with timed('sharpe.moments'):
+            moments = None
+            if self.covariance is not None and len(self.price_data) \
+                    and self.covariance.last_date == self.price_data.index[-1].date():
+                moments = self.covariance.moments(self.ticker_list)
+            
+            if moments is not None:
+                mean_returns = pd.Series(moments[0], index=self.ticker_list)
+                covariance = pd.DataFrame(moments[1], index=self.ticker_list, columns=self.ticker_list)
+            else:
+                log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
+                mean_returns = log_returns.mean()
+                covariance = log_returns.cov()
         n_stocks = len(self.ticker_list)
         
         if n_stocks != len(mean_returns) or n_stocks != covariance.shape[0]:
@@ -38,46 +52,77 @@ class Sharpe(PortfolioOptimizer):
                                    risk_free_rate=risk_free_rate,
                                    n_holdings=n_stocks)
     
+    def neg_sharpe(self,
+                   weights: np.ndarray,
+                   mean_returns: np.ndarray,
+                   covar_returns: np.ndarray,
+                   risk_free_rate: float) -> float:
+        """
+        Calculate the negative Sharpe Ratio, the objective minimized by SLSQP
+        
+        1. Find portfolio return over the course of a trading year (252 days)
+        2. Find the std of excess returns of a single year
+        """
+        portfolio_return = np.sum(mean_returns * weights) * 252
+        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(covar_returns, weights))) * np.sqrt(252)
+        
+        # Convert log return to simple return for Sharpe ratio calculation
+        portfolio_simple_return = np.exp(portfolio_return) - 1
+        sharpe_ratio = (portfolio_simple_return - risk_free_rate) / portfolio_volatility
+        return -sharpe_ratio
+    
+    def neg_sharpe_gradient(self,
+                            weights: np.ndarray,
+                            mean_returns: np.ndarray,
+                            covar_returns: np.ndarray,
+                            risk_free_rate: float) -> np.ndarray:
+        """
+        Closed form gradient of neg_sharpe with respect to the weights
+        
+        R = exp(252 * mu.w) - 1, dR/dw = 252 * exp(252 * mu.w) * mu
+        V = sqrt(252 * w.C.w),   dV/dw = 252 * C.w / V
+        d(-S)/dw = -(dR/dw - (R - rf) * (dV/dw) / V) / V
+        """
+        growth = np.exp(np.dot(mean_returns, weights) * 252)
+        covar_weights = np.dot(covar_returns, weights)
+        portfolio_volatility = np.sqrt(252 * np.dot(weights, covar_weights))
+        
+        return_gradient = 252 * growth * mean_returns
+        volatility_gradient = 252 * covar_weights / portfolio_volatility
+        excess_return = growth - 1 - risk_free_rate
+        return -(return_gradient - excess_return * volatility_gradient / portfolio_volatility) / portfolio_volatility
+    
     def maximize_ratio(self,
                        mean_returns: pd.Series,
                        covar_returns: pd.DataFrame,
                        risk_free_rate: float,
-                       n_holdings: int) -> Tuple[np.ndarray, float, float, float]:
+                       n_holdings: int,
+                       initial_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, float, float]:
         """
         Helper function to maximize the Sharpe ratio
-        """
-        
-        def neg_sharpe(weights: np.ndarray,
-                       mean_returns: np.ndarray,
-                       covar_returns: np.ndarray,
-                       risk_free_rate: float) -> float:
-            """
-            Calculate the Sharpe Ratio
-            
-            1. Find portfolio return over the course of a trading year (252 days)
-            2. Find the std of excess returns of a single year
-            """
-            portfolio_return = np.sum(mean_returns * weights) * 252
-            portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(covar_returns, weights))) * np.sqrt(252)
-            
-            # Convert log return to simple return for Sharpe ratio calculation
-            portfolio_simple_return = np.exp(portfolio_return) - 1
-            sharpe_ratio = (portfolio_simple_return - risk_free_rate) / portfolio_volatility
-            return -sharpe_ratio
         
+        initial_weights warm starts the solve, i.e. from the previous rebalance of a backtest, equal weights if None
+        """
         mean_returns = mean_returns.values
         covar_returns = covar_returns.values
         
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
+        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)})
         bounds = tuple((0, 1) for _ in range(n_holdings))
-        initial_weights = np.array([1/n_holdings] * n_holdings)
+        if initial_weights is None:
+            initial_weights = np.array([1/n_holdings] * n_holdings)
+        args = (mean_returns, covar_returns, risk_free_rate)
         
-        result = optimize.minimize(fun=neg_sharpe,
-                                   x0=initial_weights,
-                                   args=(mean_returns, covar_returns, risk_free_rate),
-                                   method='SLSQP',
-                                   bounds=bounds,
-                                   constraints=constraints)
+        if self.check_gradients:
+            self.check_gradient(self.neg_sharpe, self.neg_sharpe_gradient, initial_weights, args)
+        
+        with timed('sharpe.solve'):
+            result = optimize.minimize(fun=self.neg_sharpe,
+                                       x0=initial_weights,
+                                       args=args,
+                                       jac=self.neg_sharpe_gradient,
+                                       method='SLSQP',
+                                       bounds=bounds,
+                                       constraints=constraints)
         
         optimized_weights = result.x.round(4)
         sharpe_ratio = -result.fun.round(4)
@@ -88,4 +133,66 @@ class Sharpe(PortfolioOptimizer):
         
         yearly_volatility = (np.sqrt(np.dot(optimized_weights.T, np.dot(covar_returns, optimized_weights))) * np.sqrt(252)).round(4)
 
-        return optimized_weights, yearly_return, yearly_volatility, sharpe_ratio        
\ No newline at end of file
+        return optimized_weights, yearly_return, yearly_volatility, sharpe_ratio
+    
+    def efficient_frontier(self,
+                           n_points: int = 50,
+                           risk_free_rate: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Traces the mean-variance efficient frontier from the minimum variance portfolio to the highest returning holding
+        
+        1. Find log returns, their mean and the covariance matrix once
+        2. Solve the minimum variance portfolio
+        3. Minimize variance for each target return, warm starting from the previous point's weights
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: weights (n_points x holdings), yearly returns,
+            yearly volatilities and Sharpe ratios, one per frontier point
+        """
+        log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
+        mean_returns = log_returns.mean().values
+        covar_returns = log_returns.cov().values
+        n_holdings = len(self.ticker_list)
+        
+        def variance(weights: np.ndarray) -> float:
+            return np.dot(weights, np.dot(covar_returns, weights))
+        
+        def variance_gradient(weights: np.ndarray) -> np.ndarray:
+            return 2 * np.dot(covar_returns, weights)
+        
+        # daily variances are ~1e-4, far below SLSQP's default ftol of 1e-6
+        options = {'ftol': 1e-12}
+        budget = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)}
+        bounds = tuple((0, 1) for _ in range(n_holdings))
+        
+        result = optimize.minimize(fun=variance,
+                                   x0=np.array([1/n_holdings] * n_holdings),
+                                   jac=variance_gradient,
+                                   method='SLSQP',
+                                   bounds=bounds,
+                                   constraints=(budget,),
+                                   options=options)
+        
+        # targets are daily log returns, the frontier ends at the best single holding
+        target_returns = np.linspace(np.dot(mean_returns, result.x), mean_returns.max(), n_points)
+        frontier_weights = np.empty((n_points, n_holdings))
+        weights = result.x
+        
+        for index, target_return in enumerate(target_returns):
+            target = {'type': 'eq', 'fun': lambda x, t=target_return: np.dot(mean_returns, x) - t, 'jac': lambda x: mean_returns}
+            result = optimize.minimize(fun=variance,
+                                       x0=weights,
+                                       jac=variance_gradient,
+                                       method='SLSQP',
+                                       bounds=bounds,
+                                       constraints=(budget, target),
+                                       options=options)
+            weights = result.x
+            frontier_weights[index] = weights
+        
+        # Convert annualized log returns to simple returns
+        yearly_returns = np.exp(np.dot(frontier_weights, mean_returns) * 252) - 1
+        yearly_volatility = np.sqrt(np.einsum('ij,jk,ik->i', frontier_weights, covar_returns, frontier_weights)) * np.sqrt(252)
+        sharpe_ratios = (yearly_returns - risk_free_rate) / yearly_volatility
+        
+        return frontier_weights.round(4), yearly_returns.round(4), yearly_volatility.round(4), sharpe_ratios.round(4)
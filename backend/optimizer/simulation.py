@@ -0,0 +1,82 @@
+from typing import Optional
+import numpy as np
+
+# bytes of daily portfolio returns (days x portfolios) held at once, bounds the memory of a simulation
+MAX_CHUNK_BYTES = 64 * 2**20
+
+
+def simulate_portfolios(log_returns: np.ndarray,
+                        n_portfolios: int = 100_000,
+                        risk_free_rate: float = 0.0,
+                        dtype: type = np.float64,
+                        chunk_size: Optional[int] = None,
+                        seed: Optional[int] = None) -> dict:
+    """
+    Samples random long-only portfolios uniformly over the weight simplex and scores them all
+
+    Returns, volatility and ratios are computed the same way as Sharpe.neg_sharpe and Sortino.neg_sortino,
+    for a chunk of portfolios at a time with matrix products instead of a loop over the portfolios.
+
+    Args:
+        log_returns (np.ndarray): daily log returns (days x holdings)
+        n_portfolios (int): number of portfolios to sample
+        risk_free_rate (float): yearly risk free rate
+        dtype (type): np.float64, or np.float32 to halve the memory and speed up the matrix products
+        chunk_size (Optional[int]): portfolios scored at once, sized to MAX_CHUNK_BYTES if None
+        seed (Optional[int]): random seed so runs are reproducible
+
+    Returns:
+        dict: yearly returns, yearly volatility, Sharpe and Sortino ratios (one array entry per portfolio) and
+        the weights of the best Sharpe and best Sortino portfolio found
+
+    Raises:
+        ValueError: if log_returns has no days or no holdings
+    """
+    rng = np.random.default_rng(seed)
+    log_returns = np.ascontiguousarray(log_returns, dtype=dtype)
+    n_days, n_holdings = log_returns.shape
+    if n_days == 0 or n_holdings == 0:
+        raise ValueError("log_returns needs at least one day and one holding")
+    mean_returns = log_returns.mean(axis=0)
+    covariance = np.cov(log_returns, rowvar=False).astype(dtype).reshape(n_holdings, n_holdings)
+
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CHUNK_BYTES // (n_days * np.dtype(dtype).itemsize))
+
+    yearly_returns = np.empty(n_portfolios, dtype=dtype)
+    yearly_volatility = np.empty(n_portfolios, dtype=dtype)
+    downside_deviation = np.empty(n_portfolios, dtype=dtype)
+    best_sharpe = (-np.inf, None)
+    best_sortino = (-np.inf, None)
+
+    for start in range(0, n_portfolios, chunk_size):
+        end = min(start + chunk_size, n_portfolios)
+
+        # normalized exponential draws are uniform over the simplex, i.e. Dirichlet(1, ..., 1)
+        weights = rng.standard_exponential((end - start, n_holdings), dtype=dtype)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        yearly_returns[start:end] = np.expm1(252 * (weights @ mean_returns))
+        yearly_volatility[start:end] = np.sqrt(252 * np.einsum('ij,jk,ik->i', weights, covariance, weights))
+
+        # daily simple returns below zero of every portfolio in the chunk (days x portfolios), in place
+        downside = log_returns @ weights.T
+        np.expm1(downside, out=downside)
+        np.minimum(downside, 0, out=downside)
+        downside_deviation[start:end] = np.sqrt(np.einsum('ij,ij->j', downside, downside) / n_days * 252)
+
+        sharpe = (yearly_returns[start:end] - risk_free_rate) / yearly_volatility[start:end]
+        sortino = (yearly_returns[start:end] - risk_free_rate) / downside_deviation[start:end]
+        if sharpe.max() > best_sharpe[0]:
+            best_sharpe = (sharpe.max(), weights[sharpe.argmax()].copy())
+        if sortino.max() > best_sortino[0]:
+            best_sortino = (sortino.max(), weights[sortino.argmax()].copy())
+
+    return {
+        'yearly_returns': yearly_returns,
+        'yearly_volatility': yearly_volatility,
+        'sharpe_ratios': (yearly_returns - risk_free_rate) / yearly_volatility,
+        'sortino_ratios': (yearly_returns - risk_free_rate) / downside_deviation,
+        'best_sharpe_weights': best_sharpe[1],
+        'best_sortino_weights': best_sortino[1]
+    }
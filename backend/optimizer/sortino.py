@@ -1,8 +1,8 @@
-import pandas as pd
 from .portfolio_optimizer import PortfolioOptimizer
 from scipy import optimize
-from typing import Tuple
+from typing import Optional, Tuple
 import numpy as np
+from ..utils.metrics import timed
 
 class Sortino(PortfolioOptimizer):
     """
@@ -13,51 +13,123 @@ class Sortino(PortfolioOptimizer):
     """
     
     def optimize_portfolio(self, risk_free_rate: float = 0) -> Tuple[np.ndarray, float, float, float]:
-        log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
-        mean_returns = log_returns.mean()
-        cov_matrix = log_returns.cov()
+        with timed('sortino.moments'):
+            log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
+            # contiguous float64 (days x holdings) array so the objective never touches pandas
+            returns = np.ascontiguousarray(log_returns.values, dtype=np.float64)
+            mean_returns = returns.mean(axis=0)
         n_stocks = len(self.ticker_list)
         
         return self.maximize_ratio(mean_returns=mean_returns,
-                                   cov_matrix=cov_matrix,
+                                   log_returns=returns,
                                    risk_free_rate=risk_free_rate,
                                    n_holdings=n_stocks)
     
-    def calculate_downside_deviation(self, log_returns: pd.DataFrame, weights: np.ndarray, threshold: float = 0) -> float:
-        portfolio_log_returns = np.dot(log_returns, weights)
+    def calculate_downside_deviation(self,
+                                     log_returns: np.ndarray,
+                                     weights: np.ndarray,
+                                     threshold: float = 0,
+                                     out: Optional[np.ndarray] = None) -> float:
+        """
+        Annualized downside deviation of the portfolio's daily simple returns
+        
+        Args:
+            log_returns (np.ndarray): contiguous float64 array of daily log returns (days x holdings)
+            weights (np.ndarray): portfolio weights
+            threshold (float): minimum acceptable daily return
+            out (Optional[np.ndarray]): scratch buffer of length days, reused across calls to avoid allocations
+        """
+        portfolio_returns = np.empty(log_returns.shape[0]) if out is None else out
+        np.dot(log_returns, weights, out=portfolio_returns)
         # Convert log returns to simple returns for downside deviation calculation
-        portfolio_simple_returns = np.exp(portfolio_log_returns) - 1
-        downside_returns = np.minimum(portfolio_simple_returns - threshold, 0)
-        return np.sqrt(np.mean(downside_returns**2)) * np.sqrt(252)
+        np.expm1(portfolio_returns, out=portfolio_returns)
+        portfolio_returns -= threshold
+        np.minimum(portfolio_returns, 0, out=portfolio_returns)
+        return np.sqrt(np.dot(portfolio_returns, portfolio_returns) / portfolio_returns.shape[0]) * np.sqrt(252)
+    
+    def neg_sortino(self,
+                    weights: np.ndarray,
+                    mean_returns: np.ndarray,
+                    log_returns: np.ndarray,
+                    risk_free_rate: float,
+                    out: Optional[np.ndarray] = None) -> float:
+        """
+        Negative Sortino ratio, the objective minimized by SLSQP
+        """
+        portfolio_log_return = np.dot(mean_returns, weights) * 252
+        # Convert annualized log return to simple return
+        portfolio_simple_return = np.exp(portfolio_log_return) - 1
+        downside_deviation = self.calculate_downside_deviation(log_returns, weights, out=out)
+        sortino_ratio = (portfolio_simple_return - risk_free_rate) / downside_deviation
+        return -sortino_ratio
+    
+    def downside_deviation_gradient(self,
+                                    log_returns: np.ndarray,
+                                    weights: np.ndarray,
+                                    threshold: float = 0,
+                                    out: Optional[np.ndarray] = None) -> Tuple[float, np.ndarray]:
+        """
+        Downside deviation and its (sub)gradient with respect to the weights
+        
+        With d_t = min(exp(r_t) - 1 - threshold, 0) and DD = sqrt(252 * mean(d^2)),
+        dDD/dw = 252 / (DD * T) * X^T (d * exp(r)). Days exactly at the threshold contribute 0.
+        """
+        downside_returns = np.empty(log_returns.shape[0]) if out is None else out
+        downside_deviation = self.calculate_downside_deviation(log_returns, weights, threshold, out=downside_returns)
+        
+        # exp(r_t) = d_t + threshold + 1 wherever d_t is non-zero
+        downside_returns *= downside_returns + threshold + 1
+        gradient = np.dot(log_returns.T, downside_returns) * (252 / (downside_deviation * log_returns.shape[0]))
+        return downside_deviation, gradient
+    
+    def neg_sortino_gradient(self,
+                             weights: np.ndarray,
+                             mean_returns: np.ndarray,
+                             log_returns: np.ndarray,
+                             risk_free_rate: float,
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Subgradient of neg_sortino with respect to the weights
+        """
+        growth = np.exp(np.dot(mean_returns, weights) * 252)
+        downside_deviation, downside_gradient = self.downside_deviation_gradient(log_returns, weights, out=out)
+        
+        return_gradient = 252 * growth * mean_returns
+        excess_return = growth - 1 - risk_free_rate
+        return -(return_gradient - excess_return * downside_gradient / downside_deviation) / downside_deviation
     
     def maximize_ratio(self,
-                       mean_returns: pd.Series,
-                       cov_matrix: pd.DataFrame,
+                       mean_returns: np.ndarray,
+                       log_returns: np.ndarray,
                        risk_free_rate: float,
-                       n_holdings: int) -> Tuple[np.ndarray, float, float, float]:
+                       n_holdings: int,
+                       initial_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, float, float]:
+        """
+        Helper function to maximize the Sortino ratio
         
-        def neg_sortino(weights: np.ndarray,
-                        mean_returns: pd.Series,
-                        cov_matrix: pd.DataFrame,
-                        risk_free_rate: float) -> float:
-            log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
-            portfolio_log_return = np.sum(mean_returns * weights) * 252
-            # Convert annualized log return to simple return
-            portfolio_simple_return = np.exp(portfolio_log_return) - 1
-            downside_deviation = self.calculate_downside_deviation(log_returns, weights)
-            sortino_ratio = (portfolio_simple_return - risk_free_rate) / downside_deviation
-            return -sortino_ratio
+        initial_weights warm starts the solve, i.e. from the previous rebalance of a backtest, equal weights if None
+        """
+        
+        # one scratch buffer shared by every function and gradient evaluation
+        buffer = np.empty(log_returns.shape[0])
         
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
+        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)})
         bounds = tuple((0, 1) for _ in range(n_holdings))
-        initial_weights = np.array([1/n_holdings] * n_holdings)
+        if initial_weights is None:
+            initial_weights = np.array([1/n_holdings] * n_holdings)
+        args = (mean_returns, log_returns, risk_free_rate, buffer)
+        
+        if self.check_gradients:
+            self.check_gradient(self.neg_sortino, self.neg_sortino_gradient, initial_weights, args)
         
-        result = optimize.minimize(fun=neg_sortino,
-                                   x0=initial_weights,
-                                   args=(mean_returns, cov_matrix, risk_free_rate),
-                                   method='SLSQP',
-                                   bounds=bounds,
-                                   constraints=constraints)
+        with timed('sortino.solve'):
+            result = optimize.minimize(fun=self.neg_sortino,
+                                       x0=initial_weights,
+                                       args=args,
+                                       jac=self.neg_sortino_gradient,
+                                       method='SLSQP',
+                                       bounds=bounds,
+                                       constraints=constraints)
         
         optimized_weights = result.x.round(4)
         sortino_ratio = -result.fun.round(4)
@@ -66,7 +138,6 @@ class Sortino(PortfolioOptimizer):
         portfolio_log_return = np.sum(mean_returns * optimized_weights) * 252
         portfolio_return = (np.exp(portfolio_log_return) - 1).round(4)
         
-        log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
         downside_deviation = self.calculate_downside_deviation(log_returns, optimized_weights).round(4)
 
-        return optimized_weights, portfolio_return, downside_deviation, sortino_ratio
\ No newline at end of file
+        return optimized_weights, portfolio_return, downside_deviation, sortino_ratio
@@ -1,12 +1,9 @@
 from flask_restx import Namespace, Resource
-from flask_jwt_extended import jwt_required,get_jwt_identity
-from ..models.users import User
-from ..models.stocks import Stock
+from flask import request
+from flask_jwt_extended import jwt_required,current_user
+from ..models.queries import holding_tickers
 from http import HTTPStatus
-from ..utils import db
-from .sharpe import Sharpe
-from .sortino import Sortino
-import numpy as np
+from .service import cached_result, optimize_holdings
 
 metrics_namespace = Namespace('metrics', description="Metrics namespace")
 
@@ -16,85 +13,130 @@ class SharpeEndpoint(Resource):
     
     @jwt_required(refresh=True)
     def get(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
+        ticker_list = holding_tickers(current_user.id)
+        if not ticker_list:
+            return {"message": "No holdings to optimize"}, HTTPStatus.NOT_FOUND
         
-        holdings = Stock.query.filter_by(user_id=current_user.id).all()
-        ticker_list = [holding.ticker for holding in holdings]
-        
-        s = Sharpe(ticker_list=ticker_list)
-        
-        weights, yearly_returns, yearly_volatility, sharpe_ratio = s.optimize_portfolio(risk_free_rate=0.02)
-        
-        # Convert numpy arrays to lists
-        if isinstance(weights, np.ndarray):
-            weights = weights.tolist()
-        else:
-            weights
-        
-        if isinstance(yearly_returns, np.float64):
-            yearly_returns = float(yearly_returns)
-        else:
-            yearly_returns
-        
-        if isinstance(yearly_volatility, np.float64):
-            yearly_volatility = float(yearly_volatility)
-        else:
-            yearly_volatility
-        
-        if isinstance(sharpe_ratio, np.float64):
-            sharpe_ratio = float(sharpe_ratio)
-        else:
-            sharpe_ratio
-
-        
-        return {
-            "Optimized weights": weights,
-            "Yearly returns": yearly_returns,
-            "Yearly volatility": yearly_volatility,
-            "Sharpe ratio": sharpe_ratio
-        }, HTTPStatus.OK
+        return optimize_holdings(method='sharpe', ticker_list=ticker_list, risk_free_rate=0.02), HTTPStatus.OK
 
 @metrics_namespace.route("/sortino")
 class SortinoEndpoint(Resource):
     
     @jwt_required(refresh=True)
     def get(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
-        
-        holdings = Stock.query.filter_by(user_id=current_user.id).all()
-        ticker_list = [holding.ticker for holding in holdings]
-        
-        s = Sortino(ticker_list=ticker_list)
-        
-        weights, yearly_returns, yearly_volatility, sortino_ratio = s.optimize_portfolio(risk_free_rate=0.02)
+        ticker_list = holding_tickers(current_user.id)
+        if not ticker_list:
+            return {"message": "No holdings to optimize"}, HTTPStatus.NOT_FOUND
         
-        # Convert numpy arrays to lists
-        if isinstance(weights, np.ndarray):
-            weights = weights.tolist()
-        else:
-            weights
+        return optimize_holdings(method='sortino', ticker_list=ticker_list, risk_free_rate=0.02), HTTPStatus.OK
+
+
+@metrics_namespace.route("/frontier")
+class FrontierEndpoint(Resource):
+    
+    @metrics_namespace.doc(params={'points': 'Number of frontier points (default 50, max 200)'})
+    @jwt_required(refresh=True)
+    def get(self):
+        ticker_list = holding_tickers(current_user.id)
+        if not ticker_list:
+            return {"message": "No holdings to optimize"}, HTTPStatus.NOT_FOUND
         
-        if isinstance(yearly_returns, np.float64):
-            yearly_returns = float(yearly_returns)
-        else:
-            yearly_returns
+        n_points = request.args.get('points', default=50, type=int)
+        if n_points < 2 or n_points > 200:
+            return {"message": "points must be between 2 and 200"}, HTTPStatus.BAD_REQUEST
         
-        if isinstance(yearly_volatility, np.float64):
-            yearly_volatility = float(yearly_volatility)
-        else:
-            yearly_volatility
+        from .sharpe import Sharpe
+        s = Sharpe(ticker_list=ticker_list)
         
-        if isinstance(sortino_ratio, np.float64):
-            sortino_ratio = float(sortino_ratio)
-        else:
-            sortino_ratio
-
+        weights, yearly_returns, yearly_volatility, sharpe_ratios = s.efficient_frontier(n_points=n_points,
+                                                                                         risk_free_rate=0.02)
+        
+        frontier = [
+            {
+                "Optimized weights": point_weights,
+                "Yearly returns": point_return,
+                "Yearly volatility": point_volatility,
+                "Sharpe ratio": point_sharpe
+            }
+            for point_weights, point_return, point_volatility, point_sharpe in zip(weights.tolist(),
+                                                                                    yearly_returns.tolist(),
+                                                                                    yearly_volatility.tolist(),
+                                                                                    sharpe_ratios.tolist())
+        ]
         
         return {
-            "Optimized weights": weights,
-            "Yearly returns": yearly_returns,
-            "Yearly volatility": yearly_volatility,
-            "Sortino ratio": sortino_ratio
-        }, HTTPStatus.OK
\ No newline at end of file
+            "Tickers": ticker_list,
+            "Frontier": frontier
+        }, HTTPStatus.OK
+
+@metrics_namespace.route("/simulate")
+class SimulateEndpoint(Resource):
+    
+    @metrics_namespace.doc(params={'portfolios': 'Number of random portfolios (default 100000, max 1000000)',
+                                   'points': 'Portfolios returned for plotting (default 2000, max 20000)',
+                                   'float32': 'Compute in single precision (default false)'})
+    @jwt_required(refresh=True)
+    def get(self):
+        ticker_list = holding_tickers(current_user.id)
+        if not ticker_list:
+            return {"message": "No holdings to simulate"}, HTTPStatus.BAD_REQUEST
+        
+        n_portfolios = request.args.get('portfolios', default=100_000, type=int)
+        n_points = request.args.get('points', default=2000, type=int)
+        single_precision = request.args.get('float32', default='false').lower() in ('1', 'true', 'yes')
+        if n_portfolios < 1 or n_portfolios > 1_000_000:
+            return {"message": "portfolios must be between 1 and 1000000"}, HTTPStatus.BAD_REQUEST
+        if n_points < 0 or n_points > 20_000:
+            return {"message": "points must be between 0 and 20000"}, HTTPStatus.BAD_REQUEST
+        
+        import numpy as np
+        from .sharpe import Sharpe
+        s = Sharpe(ticker_list=ticker_list)
+        # the returns need two days of closes shared by every holding
+        if len(s.price_data) < 2:
+            return {"message": "Not enough price history shared by the holdings"}, HTTPStatus.BAD_REQUEST
+        
+        simulation = s.simulate(n_portfolios=n_portfolios,
+                                risk_free_rate=0.02,
+                                dtype=np.float32 if single_precision else np.float64)
+        
+        # the optimizers' results should sit at or above the best sampled portfolios, they are compared when
+        # already computed so the request never waits on a solve
+        data_version = s.price_store.version(ticker_list)
+        optimized_sharpe = cached_result('sharpe', ticker_list, 0.02, data_version)
+        optimized_sortino = cached_result('sortino', ticker_list, 0.02, data_version)
+        
+        # single precision values are widened before rounding so they serialize as short decimals
+        cloud = [
+            {
+                "Yearly returns": point_return,
+                "Yearly volatility": point_volatility,
+                "Sharpe ratio": point_sharpe,
+                "Sortino ratio": point_sortino
+            }
+            for point_return, point_volatility, point_sharpe, point_sortino in zip(
+                simulation['yearly_returns'][:n_points].astype(float).round(4).tolist(),
+                simulation['yearly_volatility'][:n_points].astype(float).round(4).tolist(),
+                simulation['sharpe_ratios'][:n_points].astype(float).round(4).tolist(),
+                simulation['sortino_ratios'][:n_points].astype(float).round(4).tolist())
+        ]
+        
+        response = {
+            "Tickers": ticker_list,
+            "Portfolios": n_portfolios,
+            "Cloud": cloud,
+            "Best Sharpe": {
+                "Optimized weights": simulation['best_sharpe_weights'].astype(float).round(4).tolist(),
+                "Sharpe ratio": round(float(simulation['sharpe_ratios'].max()), 4)
+            },
+            "Best Sortino": {
+                "Optimized weights": simulation['best_sortino_weights'].astype(float).round(4).tolist(),
+                "Sortino ratio": round(float(simulation['sortino_ratios'].max()), 4)
+            }
+        }
+        if optimized_sharpe is not None:
+            response["Optimized Sharpe ratio"] = optimized_sharpe["Sharpe ratio"]
+        if optimized_sortino is not None:
+            response["Optimized Sortino ratio"] = optimized_sortino["Sortino ratio"]
+        
+        return response, HTTPStatus.OK
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from ..models.tickers import TickerInfo
+from ..utils import db
+
+
+def fetch_ticker_info(ticker: str) -> Dict[str, str]:
+    """
+    Looks up a ticker's company name, sector and industry on Yahoo Finance
+
+    Raises:
+        ValueError: if Yahoo Finance does not know the ticker
+    """
+    import yfinance as yf
+    stock_data = yf.Ticker(ticker=ticker).info
+
+    if not stock_data.get('shortName'):
+        raise ValueError(f"Unknown ticker {ticker}")
+
+    return {
+        'company_name': stock_data.get('shortName', ''),
+        'sector': stock_data.get('sector', ''),
+        'industry': stock_data.get('industry', '')
+    }
+
+
+def resolve_metadata(ticker_list: List[str], max_workers: int = 8) -> Tuple[Dict[str, TickerInfo], Dict[str, str]]:
+    """
+    Returns the metadata for every ticker, reading the ticker_info table first and looking up the rest concurrently
+
+    New TickerInfo rows are added to the session but not committed, so they land in the caller's transaction.
+
+    Args:
+        ticker_list (List[str]): tickers to resolve
+        max_workers (int): most Yahoo Finance lookups in flight at once
+
+    Returns:
+        Tuple[Dict[str, TickerInfo], Dict[str, str]]: metadata by ticker, error message by ticker that could not be resolved
+    """
+    ticker_list = list(dict.fromkeys(ticker_list))
+    resolved = {info.ticker: info for info in TickerInfo.query.filter(TickerInfo.ticker.in_(ticker_list)).all()}
+    missing = [ticker for ticker in ticker_list if ticker not in resolved]
+    errors = {}
+
+    if missing:
+        # the lookups are network bound, threads only wait on Yahoo and never touch the session
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            futures = {pool.submit(fetch_ticker_info, ticker): ticker for ticker in missing}
+
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    resolved[ticker] = TickerInfo(ticker=ticker, updated_at=datetime.utcnow(), **future.result())
+                except Exception as e:
+                    errors[ticker] = str(e)
+
+        db.session.add_all([resolved[ticker] for ticker in missing if ticker in resolved])
+
+    return resolved, errors
+
+
+def refresh_ticker_info(max_age: timedelta, max_workers: int = 8) -> Tuple[int, Dict[str, str]]:
+    """
+    Looks up again every ticker whose metadata is older than max_age, meant to run on a schedule (flask refresh-tickers)
+
+    Args:
+        max_age (timedelta): metadata older than this is refreshed
+        max_workers (int): most Yahoo Finance lookups in flight at once
+
+    Returns:
+        Tuple[int, Dict[str, str]]: number of tickers refreshed, error message by ticker that kept its old metadata
+    """
+    stale = {info.ticker: info for info in TickerInfo.query.filter(TickerInfo.updated_at < datetime.utcnow() - max_age).all()}
+    errors = {}
+
+    if not stale:
+        return 0, errors
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as pool:
+        futures = {pool.submit(fetch_ticker_info, ticker): ticker for ticker in stale}
+
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                for key, value in future.result().items():
+                    setattr(stale[ticker], key, value)
+                stale[ticker].updated_at = datetime.utcnow()
+            except Exception as e:
+                errors[ticker] = str(e)
+
+    db.session.commit()
+    return len(stale) - len(errors), errors
@@ -1,11 +1,18 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required,get_jwt_identity
-from flask import request
-import yfinance as yf
-from ..models.users import User
+from flask_jwt_extended import jwt_required,current_user
+from flask import Response, current_app, request, stream_with_context
+import csv
+import io
+import json
+import math
+from typing import List, Tuple
 from ..models.stocks import Stock
+from ..models.queries import holding_tickers, iter_holdings
 from http import HTTPStatus
+from sqlalchemy.exc import IntegrityError
 from ..utils import db
+from ..utils.upsert import upsert
+from .metadata import resolve_metadata
 
 stocks_namespace = Namespace('stocks', description="Stocks namespace")
 
@@ -25,6 +32,79 @@ delete_stock_model = stocks_namespace.model(
     }
 )
 
+bulk_stock_model = stocks_namespace.model(
+    'BulkStocks',
+    {
+        'positions': fields.List(fields.Nested(stock_model), required=True, description="Positions to add")
+    }
+)
+
+# accepted CSV headers, brokerage exports name the columns differently
+CSV_COLUMNS = {
+    'ticker': 'ticker',
+    'symbol': 'ticker',
+    'quantity': 'quantity',
+    'shares': 'quantity',
+    'average_price': 'average_price',
+    'average_cost': 'average_price',
+    'avg_price': 'average_price',
+    'cost_basis_per_share': 'average_price'
+}
+
+def read_positions() -> List[dict]:
+    """
+    Reads the positions of a bulk import from a JSON body, a text/csv body or an uploaded CSV file
+    """
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True)
+    else:
+        data = request.get_json()
+        return data.get('positions', []) if isinstance(data, dict) else data
+    
+    positions = []
+    for row in csv.DictReader(io.StringIO(text)):
+        position = {}
+        for column, value in row.items():
+            key = CSV_COLUMNS.get((column or '').strip().lower().replace(' ', '_'))
+            if key is not None:
+                position[key] = value
+        positions.append(position)
+    return positions
+
+def normalize_ticker(ticker) -> str:
+    """
+    Upper cases and strips a ticker so 'spy' and 'SPY ' are the same holding
+
+    Raises:
+        ValueError: if the ticker is missing or longer than the ticker column
+    """
+    ticker = str(ticker or '').strip().upper()
+    if not ticker or len(ticker) > 10:
+        raise ValueError("Missing or invalid ticker")
+    return ticker
+
+def validate_position(position: dict) -> Tuple[str, float, float]:
+    """
+    Normalizes one position of a single add, an update or a bulk import
+
+    Raises:
+        ValueError: if the ticker is missing or the quantity or average price is not a finite number
+    """
+    ticker = normalize_ticker(position.get('ticker'))
+    
+    try:
+        quantity = float(str(position.get('quantity')).replace(',', ''))
+        average_price = float(str(position.get('average_price')).replace(',', '').replace('$', ''))
+    except ValueError:
+        raise ValueError("quantity and average_price must be numbers")
+    
+    if not math.isfinite(quantity) or not math.isfinite(average_price):
+        raise ValueError("quantity and average_price must be finite numbers")
+    
+    return ticker, quantity, average_price
+
 # register route
 @stocks_namespace.route('/stocks/')
 class AddGetUpdateDelete(Resource):
@@ -34,26 +114,33 @@ class AddGetUpdateDelete(Resource):
     # give access through refresh token
     @jwt_required(refresh=True)
     def post(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
-        
         data = request.get_json()
-        ticker = data.get('ticker')
+        try:
+            ticker, quantity, average_price = validate_position(data if isinstance(data, dict) else {})
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
         
-        stock = yf.Ticker(ticker=ticker)
-        stock_data = stock.info
+        # a local read for any symbol already known, a single Yahoo lookup otherwise
+        metadata, errors = resolve_metadata([ticker], max_workers=1)
+        if ticker in errors:
+            return {"message": errors[ticker]}, HTTPStatus.BAD_REQUEST
         
         new_stock = Stock(
             ticker=ticker,
-            company_name=stock_data.get('shortName', ''),
-            sector=stock_data.get('sector', ''),
-            industry=stock_data.get('industry', ''),
-            quantity=data.get('quantity'),
-            average_price=data.get('average_price'),
+            info=metadata[ticker],
+            quantity=quantity,
+            average_price=average_price,
             user_id=current_user.id  # Associate stock with the user
         )
         
-        new_stock.save()
+        try:
+            new_stock.save()
+        except IntegrityError as e:
+            db.session.rollback()
+            # only the (user_id, ticker) index means the holding exists, drivers word the violation differently
+            if db.session.query(Stock.query.filter_by(user_id=current_user.id, ticker=ticker).exists()).scalar():
+                return {"message": f"Stock {ticker} is already held"}, HTTPStatus.CONFLICT
+            return {"message": f"Stock {ticker} could not be added: {e.orig}"}, HTTPStatus.BAD_REQUEST
         
         # Serialize the Stock object into a dictionary
         return {
@@ -69,56 +156,140 @@ class AddGetUpdateDelete(Resource):
     
     @jwt_required(refresh=True)
     def get(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
-        
-        holdings = Stock.query.filter_by(user_id=current_user.id).all()
-        
-        holdings_to_json = [
-            {
-                'ticker': stock.ticker,
-                'company_name': stock.company_name,
-                'sector': stock.sector,
-                'industry': stock.industry,
-                'quantity': stock.quantity,
-                'average_cost': stock.average_price
-            }
-            for stock in holdings
-        ]
-        
-        return holdings_to_json, HTTPStatus.OK
+        user_id = current_user.id
+        
+        # stream the JSON array row by row so large portfolios are never held in memory at once
+        def generate():
+            yield '['
+            for index, (ticker, company_name, sector, industry, quantity, average_price) in enumerate(iter_holdings(user_id)):
+                holding = {
+                    'ticker': ticker,
+                    'company_name': company_name,
+                    'sector': sector,
+                    'industry': industry,
+                    'quantity': quantity,
+                    'average_cost': average_price
+                }
+                yield (',' if index else '') + json.dumps(holding)
+            yield ']'
+        
+        return Response(stream_with_context(generate()), status=HTTPStatus.OK, mimetype='application/json')
 
     @stocks_namespace.expect(delete_stock_model)
     @jwt_required(refresh=True)
     def delete(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
-        
         data = request.get_json()
-        ticker = data.get('ticker')
+        try:
+            ticker = normalize_ticker(data.get('ticker'))
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
         
-        stock = Stock.query.filter_by(user_id=current_user.id, ticker=ticker).first()
+        # a single indexed delete, the row count tells whether the holding existed
+        deleted = Stock.query.filter_by(user_id=current_user.id, ticker=ticker).delete(synchronize_session=False)
+        db.session.commit()
         
-        if not stock:
+        if not deleted:
             return {"message": "Stock not found"}, HTTPStatus.NOT_FOUND
-
-        stock.delete()
         
         return {"message": f"Stock {ticker} deleted successfully"}, HTTPStatus.OK
     
     @stocks_namespace.expect(stock_model)
     @jwt_required(refresh=True)
     def put(self):
-        username = get_jwt_identity()
-        current_user = User.query.filter_by(username=username).first()
-        
         data = request.get_json()
-        ticker = data.get('ticker')
+        try:
+            ticker, quantity, average_price = validate_position(data if isinstance(data, dict) else {})
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+        
+        # the upsert may add a holding, so the ticker needs its metadata row
+        metadata, errors = resolve_metadata([ticker], max_workers=1)
+        if ticker in errors:
+            return {"message": errors[ticker]}, HTTPStatus.BAD_REQUEST
         
-        order_to_update = Stock.query.filter_by(user_id=current_user.id, ticker=ticker).first()
-        order_to_update.quantity = data.get('quantity')
-        order_to_update.average_price = data.get('average_price')
+        upsert(Stock,
+               values={'user_id': current_user.id, 'ticker': ticker, 'quantity': quantity, 'average_price': average_price},
+               index_elements=['user_id', 'ticker'],
+               update_columns=['quantity', 'average_price'])
         db.session.commit()
         
         return {
-            "message": f"Stock {ticker} has been updated with a quantity of {order_to_update.quantity} and average price of {order_to_update.average_price}"}, HTTPStatus.OK        
\ No newline at end of file
+            "message": f"Stock {ticker} has been updated with a quantity of {quantity} and average price of {average_price}"}, HTTPStatus.OK        
+
+# register route
+@stocks_namespace.route('/stocks/bulk')
+class BulkAdd(Resource):
+    
+    # expect a list of positions, a text/csv body or a CSV file upload
+    @stocks_namespace.expect(bulk_stock_model)
+    @jwt_required(refresh=True)
+    def post(self):
+        positions = read_positions()
+        max_rows = current_app.config['BULK_IMPORT_MAX_ROWS']
+        if not isinstance(positions, list) or len(positions) > max_rows:
+            return {"message": f"Expected a list of at most {max_rows} positions"}, HTTPStatus.BAD_REQUEST
+        
+        held = set(holding_tickers(current_user.id))
+        uploaded = set()
+        errors = []
+        valid = []
+        
+        for row, position in enumerate(positions):
+            try:
+                ticker, quantity, average_price = validate_position(position if isinstance(position, dict) else {})
+            except ValueError as e:
+                errors.append({"row": row, "ticker": position.get('ticker') if isinstance(position, dict) else None, "message": str(e)})
+                continue
+            
+            if ticker in held:
+                errors.append({"row": row, "ticker": ticker, "message": f"Stock {ticker} is already held"})
+                continue
+            if ticker in uploaded:
+                errors.append({"row": row, "ticker": ticker, "message": f"Stock {ticker} appears more than once"})
+                continue
+            
+            uploaded.add(ticker)
+            valid.append((row, ticker, quantity, average_price))
+        
+        metadata, lookup_errors = resolve_metadata([ticker for _, ticker, _, _ in valid],
+                                                   max_workers=current_app.config['METADATA_LOOKUP_WORKERS'])
+        
+        new_stocks = []
+        for row, ticker, quantity, average_price in valid:
+            if ticker in lookup_errors:
+                errors.append({"row": row, "ticker": ticker, "message": lookup_errors[ticker]})
+                continue
+            
+            new_stocks.append(Stock(
+                ticker=ticker,
+                info=metadata[ticker],
+                quantity=quantity,
+                average_price=average_price,
+                user_id=current_user.id  # Associate stock with the user
+            ))
+        
+        # every row and any new ticker metadata in a single transaction
+        db.session.add_all(new_stocks)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # another request added one of the tickers since the held set was read
+            db.session.rollback()
+            return {"message": "Holdings changed during the import, please retry"}, HTTPStatus.CONFLICT
+        
+        return {
+            "created": [
+                {
+                    "id": stock.id,
+                    "ticker": stock.ticker,
+                    "company_name": stock.company_name,
+                    "sector": stock.sector,
+                    "industry": stock.industry,
+                    "quantity": stock.quantity,
+                    "average_price": stock.average_price,
+                    "user_id": stock.user_id
+                }
+                for stock in new_stocks
+            ],
+            "errors": sorted(errors, key=lambda error: error['row'])
+        }, HTTPStatus.CREATED if new_stocks else HTTPStatus.BAD_REQUEST
\ No newline at end of file
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# seconds to connect and to wait between bytes of the response, a stalled server fails the run instead of hanging it
+DEFAULT_TIMEOUT = (5, 30)
+
+# statuses worth retrying, the server being busy or briefly down
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(retries: int = 3, backoff_factor: float = 1.0, pool_size: int = 4) -> requests.Session:
+    """
+    Builds a session whose connections are pooled and kept alive across requests, with bounded retries
+
+    Failed connections and RETRY_STATUSES are retried up to retries times, waiting backoff_factor * 2^n seconds
+    between attempts (or the server's Retry-After). Responses are requested compressed.
+
+    Args:
+        retries (int): retries after the first attempt
+        backoff_factor (float): base of the exponential wait between retries
+        pool_size (int): connections kept open per host
+
+    Returns:
+        requests.Session: the session
+    """
+    retry = Retry(total=retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUSES,
+                  allowed_methods=('GET', 'HEAD'),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'portfolio-pilot'})
+    return session
+
+
+class Page(NamedTuple):
+    """
+    @status_code: status of the response, 304 when the cached copy is still current
+    @content: body of the response, or of the cached copy on a 304, None on any other status
+    @modified: False when content is the cached copy
+    """
+    status_code: int
+    content: Optional[bytes]
+    modified: bool
+
+
+class CachedFetcher:
+    """
+    Fetches pages with conditional requests, keeping the last copy of each URL on disk
+
+    The ETag and Last-Modified of every 200 response are stored next to its body and sent back as If-None-Match
+    and If-Modified-Since, so an unchanged page costs a 304 with no body to download or parse.
+    """
+
+    def __init__(self,
+                 cache_dir: str,
+                 session: Optional[requests.Session] = None,
+                 timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT) -> None:
+        """
+        Constructor for the CachedFetcher class
+
+        @cache_dir: directory of the cached bodies and their validators
+        @session: session requests are sent with, build_session() if None
+        @timeout: seconds, or (connect, read) seconds, before a request is abandoned
+        """
+        self.cache_dir = cache_dir
+        self.session = session if session is not None else build_session()
+        self.timeout = timeout
+
+    def paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.body"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def fetch(self, url: str) -> Page:
+        """
+        GETs url, sending the validators of the cached copy if there is one
+
+        Args:
+            url (str): page to fetch
+
+        Raises:
+            requests.RequestException: if the server cannot be reached or times out after the retries
+
+        Returns:
+            Page: the status and the current body of the page
+        """
+        body_path, meta_path = self.paths(url)
+        headers = {}
+        if os.path.exists(body_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and headers:
+            with open(body_path, 'rb') as f:
+                return Page(status_code=304, content=f.read(), modified=False)
+
+        if response.status_code != 200:
+            return Page(status_code=response.status_code, content=None, modified=True)
+
+        self.store(url, response)
+        return Page(status_code=200, content=response.content, modified=True)
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """
+        Writes the body and validators of a response, the body first so a copy is never missing its body
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        body_path, meta_path = self.paths(url)
+
+        if etag is None and last_modified is None:
+            # the page can no longer be validated, drop the copy so stale validators are not sent again
+            for path in (meta_path, body_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f"{body_path}.tmp", 'wb') as f:
+            f.write(response.content)
+        os.replace(f"{body_path}.tmp", body_path)
+
+        with open(f"{meta_path}.tmp", 'w') as f:
+            json.dump({'url': url, 'etag': etag, 'last_modified': last_modified,
+                       'fetched_at': datetime.utcnow().isoformat()}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
@@ -0,0 +1,235 @@
+from collections import deque
+from typing import Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IndicatorEngine:
+    """
+    Lays a long stock_data frame (one row per ticker and day) out as wide (bars x tickers) arrays so indicators
+    are computed for every ticker at once, then maps the results back onto the long rows
+
+    Each ticker's bars are packed from the top of its column in date order, so rolling windows and averages see
+    exactly the bars a per-ticker computation would, even when tickers trade on different calendars.
+    """
+
+    def __init__(self, stock_data: pd.DataFrame) -> None:
+        """
+        Constructor for the IndicatorEngine class
+
+        @stock_data: long frame with a Ticker column, sorted by ticker then date
+        @tickers: column order of the wide arrays
+        @row, column: position of every long row in the wide arrays
+        """
+        self.stock_data = stock_data
+        self.column, self.tickers = pd.factorize(stock_data['Ticker'])
+
+        # rows are grouped by ticker, so a row's bar number is its distance from the ticker's first row
+        starts = np.flatnonzero(np.r_[True, self.column[1:] != self.column[:-1]])
+        lengths = np.diff(np.r_[starts, len(self.column)])
+        self.row = np.arange(len(self.column)) - np.repeat(starts, lengths)
+        self.shape = (int(lengths.max()) if len(lengths) else 0, len(self.tickers))
+
+    def wide(self, column: str) -> np.ndarray:
+        """
+        Returns a column of stock_data as a float64 (bars x tickers) array, NaN past each ticker's last bar
+        """
+        values = np.full(self.shape, np.nan)
+        values[self.row, self.column] = self.stock_data[column].to_numpy(dtype=np.float64)
+        return values
+
+    def long(self, values: np.ndarray) -> np.ndarray:
+        """
+        Returns a (bars x tickers) indicator as one value per stock_data row
+        """
+        return values[self.row, self.column]
+
+
+def rolling_max(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Rolling maximum down each column, NaN until a full window is available or when the window holds a NaN
+    """
+    result = np.full(values.shape, np.nan)
+    if values.shape[0] >= length:
+        result[length - 1:] = sliding_window_view(values, length, axis=0).max(axis=-1)
+    return result
+
+
+def rolling_min(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Rolling minimum down each column, NaN until a full window is available or when the window holds a NaN
+    """
+    result = np.full(values.shape, np.nan)
+    if values.shape[0] >= length:
+        result[length - 1:] = sliding_window_view(values, length, axis=0).min(axis=-1)
+    return result
+
+
+def donchian(high: np.ndarray,
+             low: np.ndarray,
+             upper_length: int = 20,
+             lower_length: int = 20) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Donchian channels, same values as pandas_ta.donchian
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: lower, middle and upper channels
+    """
+    lower = rolling_min(low, lower_length)
+    upper = rolling_max(high, upper_length)
+    return lower, 0.5 * (lower + upper), upper
+
+
+def wilder_average(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Wilder's moving average down each column, same values as pandas_ta.rma
+
+    An adjusted exponential average with alpha = 1 / length, NaN until length observations were seen.
+    Missing values keep the previous average but still age the older observations.
+    """
+    decay = 1 - 1 / length
+    numerator = np.zeros(values.shape[1])
+    denominator = np.zeros(values.shape[1])
+    observations = np.zeros(values.shape[1])
+    result = np.full(values.shape, np.nan)
+
+    for index in range(values.shape[0]):
+        observed = ~np.isnan(values[index])
+        numerator *= decay
+        denominator *= decay
+        numerator += np.where(observed, values[index], 0)
+        denominator += observed
+        observations += observed
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[index] = np.where(observations >= length, numerator / denominator, np.nan)
+
+    return result
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """
+    Wilder's relative strength index down each column, same values as pandas_ta.rsi
+    """
+    change = np.full(close.shape, np.nan)
+    change[1:] = close[1:] - close[:-1]
+
+    gains = wilder_average(np.where(change < 0, 0, change), length)
+    losses = np.abs(wilder_average(np.where(change > 0, 0, change), length))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gains / (gains + losses)
+
+
+class WilderState:
+    """
+    Running wilder_average of a single series, fed one value at a time
+
+    Keeps the adjusted average's numerator and denominator so an incremental run produces the
+    same values as wilder_average over the full history.
+    """
+
+    def __init__(self, length: int, numerator: float = 0.0, denominator: float = 0.0, observations: int = 0) -> None:
+        self.length = length
+        self.numerator = numerator
+        self.denominator = denominator
+        self.observations = observations
+
+    def update(self, value: float) -> float:
+        """
+        Adds the next value and returns the average, NaN until length observations were seen
+        """
+        decay = 1 - 1 / self.length
+        self.numerator *= decay
+        self.denominator *= decay
+
+        if not np.isnan(value):
+            self.numerator += value
+            self.denominator += 1
+            self.observations += 1
+
+        if self.observations < self.length:
+            return np.nan
+        return self.numerator / self.denominator
+
+    def to_dict(self) -> dict:
+        return {'length': self.length, 'numerator': self.numerator, 'denominator': self.denominator,
+                'observations': self.observations}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'WilderState':
+        return cls(**state)
+
+
+class RsiState:
+    """
+    Running rsi of a single close series, fed one close at a time
+    """
+
+    def __init__(self, length: int, last_close: float = np.nan,
+                 gains: Optional[WilderState] = None, losses: Optional[WilderState] = None) -> None:
+        self.length = length
+        self.last_close = last_close
+        self.gains = gains if gains is not None else WilderState(length)
+        self.losses = losses if losses is not None else WilderState(length)
+
+    def update(self, close: float) -> float:
+        """
+        Adds the next close and returns the RSI, NaN until enough closes were seen
+        """
+        change = close - self.last_close
+        self.last_close = close
+
+        gain = self.gains.update(max(change, 0) if not np.isnan(change) else np.nan)
+        loss = abs(self.losses.update(min(change, 0) if not np.isnan(change) else np.nan))
+
+        if np.isnan(gain) or np.isnan(loss) or gain + loss == 0:
+            return np.nan
+        return 100 * gain / (gain + loss)
+
+    def to_dict(self) -> dict:
+        return {'length': self.length, 'last_close': None if np.isnan(self.last_close) else self.last_close,
+                'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'RsiState':
+        return cls(length=state['length'],
+                   last_close=np.nan if state['last_close'] is None else state['last_close'],
+                   gains=WilderState.from_dict(state['gains']),
+                   losses=WilderState.from_dict(state['losses']))
+
+
+class DonchianState:
+    """
+    Running donchian channels of a single series, keeps only the last upper_length highs and lower_length lows
+    """
+
+    def __init__(self, upper_length: int = 20, lower_length: int = 20,
+                 highs: Iterable[float] = (), lows: Iterable[float] = ()) -> None:
+        self.highs = deque(highs, maxlen=upper_length)
+        self.lows = deque(lows, maxlen=lower_length)
+
+    def update(self, high: float, low: float) -> Tuple[float, float, float]:
+        """
+        Adds the next bar and returns the lower, middle and upper channels, NaN until the windows are full
+        """
+        self.highs.append(high)
+        self.lows.append(low)
+
+        upper = max(self.highs) if len(self.highs) == self.highs.maxlen else np.nan
+        lower = min(self.lows) if len(self.lows) == self.lows.maxlen else np.nan
+        # a NaN anywhere in a window leaves the channel undefined, like rolling_max/rolling_min
+        if np.isnan(self.highs).any():
+            upper = np.nan
+        if np.isnan(self.lows).any():
+            lower = np.nan
+        return lower, 0.5 * (lower + upper), upper
+
+    def to_dict(self) -> dict:
+        return {'upper_length': self.highs.maxlen, 'lower_length': self.lows.maxlen,
+                'highs': list(self.highs), 'lows': list(self.lows)}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'DonchianState':
+        return cls(**state)
@@ -1,43 +1,68 @@
-from .strategy import Strategy
+from .strategy import Strategy, download_bars
+import numpy as np
 import pandas as pd
-import pandas_ta
-from datetime import datetime, timedelta, time
-from bs4 import BeautifulSoup
+from . import indicators
+from .indicators import DonchianState, IndicatorEngine, RsiState
+from datetime import date, datetime, timedelta, time
+from lxml import etree, html
 import requests
 import os
-import yfinance as yf
 import json
+from typing import Dict, List, Optional
+from ..utils.metrics import timed
+from .fetch import CachedFetcher
+from .signals import signal_store
+from .snapshots import SNAPSHOT_FORMAT, read_snapshot, snapshot_times, write_snapshot
 
 
 
+SCREEN_URL = "https://www.etfscreen.com/performance.php?wl=0&s=Rtn-1mo%7Cdesc&t=6&d=i&ftS=yes&ftL=yes&vFf=dolVol21&vFl=gt&vFv=1000000&udc=default&d=i"
+
+# rows of the first 'ptbl' table inside the first 'ptbl' div
+SCREEN_ROWS = ("((//div[contains(concat(' ', normalize-space(@class), ' '), ' ptbl ')])[1]"
+               "//table[contains(concat(' ', normalize-space(@class), ' '), ' ptbl ')])[1]//tr")
+
 COLUMN_HEADINGS = ['Check_box', 'Name', 'Symbol', 'RSf', 'Rtn-1d', 'Rtn-5d', 'Rtn-1mo', 'Rtn-3mo', 'Rtn-6mo', 'Rtn-1yr', '$vol-21']
 
 # this class will need to be on an automated schedule to run, i.e. everyday at 12:50PST
 class Rsi2(Strategy):
     
-    def __init__(self) -> None:
+    def __init__(self, fetcher: Optional[CachedFetcher] = None, screen_url: str = SCREEN_URL) -> None:
         """
         Constructor for the Rsi2 class
         
+        @fetcher: fetches the etf screen with a pooled session, retries and conditional requests
+        @screen_url: page of the etf screen, i.e. a local fixture server
         @scraped_efts: etfs scraped from etf screen
         @stock_data: holds the High, Low, Open, Close, Adj close prices per each for for all stocks in scraped_etfs
-        @current_etf_file_storage_path: file path of the last time the scrape function ran
-        @new_etf_file_storage_path: current time and data for the current scrape
-        @etf_buys_storage_path: file path for the buys for the current day
+        @etf_snapshot_dir: directory keeping every scrape, one typed column per .npy file (see snapshots)
+        @etf_state_storage_path: file path for the per ticker indicator state used by run_incremental
         """
         
         self.stock_data = None
         self.scraped_etfs = None
-
-        current_timestamp = datetime.now().replace(hour=12, minute=50, second=0, microsecond=0)
-        yesterday_timestamp = current_timestamp - timedelta(days=1)
-        
-        current_timestamp_str = current_timestamp.strftime("%Y%m%d-%H%M")
-        yesterday_timestamp_str = yesterday_timestamp.strftime("%Y%m%d-%H%M")
+        self.fetcher = fetcher if fetcher is not None else CachedFetcher(cache_dir=f"{os.getcwd()}/http_cache")
+        self.screen_url = screen_url
         
-        self.current_etf_file_storage_path = f"{os.getcwd()}/{yesterday_timestamp_str}-rsi2_data.csv"
-        self.new_etf_file_storage_path = f"{os.getcwd()}/{current_timestamp_str}-rsi2_data.csv"
-        self.etf_buys_storage_path = f"{os.getcwd()}/buys.json"
+        self.etf_snapshot_dir = f"{os.getcwd()}/snapshots"
+        self.etf_state_storage_path = f"{os.getcwd()}/rsi2_state.json"
+    
+    @property
+    def new_etf_snapshot_path(self) -> str:
+        """
+        Snapshot of today's scrape, worked out on every call so a long running scheduler moves on each day
+        """
+        current_timestamp = datetime.now().replace(hour=12, minute=50, second=0, microsecond=0)
+        return os.path.join(self.etf_snapshot_dir, current_timestamp.strftime(SNAPSHOT_FORMAT))
+    
+    def latest_snapshot_path(self) -> Optional[str]:
+        """
+        Returns the newest snapshot, today's or the last one scraped before it, None if nothing was ever scraped
+        """
+        times = snapshot_times(self.etf_snapshot_dir)
+        if not times:
+            return None
+        return os.path.join(self.etf_snapshot_dir, times[-1].strftime(SNAPSHOT_FORMAT))
     
     def should_scrape(self) -> bool:
         """
@@ -46,139 +71,142 @@ class Rsi2(Strategy):
         Returns:
             bool: True if it is 12:50pm pst and the scrape has not ran, False otherwise
         """
-        # extract the date
-        day_year = self.current_etf_file_storage_path.split('/')[-1].split('-')[0]
-        file_date = datetime.strptime(day_year, '%Y%m%d').date()
-
-        # Get the current date and time
-        current_datetime = datetime.now()
-        current_date = current_datetime.date()
-        current_time = current_datetime.time()
-
         # Define the target time for comparison (12:50 PM)
         target_time = time(12, 50)
 
-        # Check if the current day is greater than the file date and the current time is after 12:50 PM
-        if current_date > file_date and current_time >= target_time:
+        # Check that today's snapshot does not exist yet and the current time is after 12:50 PM
+        if not os.path.exists(self.new_etf_snapshot_path) and datetime.now().time() >= target_time:
             return True
         return False
-    
-    def remove_previous_day_file(self) -> None:
-        """
-        Removes the previous day's scraped etf data
-        """
-        try:
-            if os.path.exists(self.current_etf_file_storage_path):
-                os.remove(self.current_etf_file_storage_path)
-                print(f"Removed file: {self.current_etf_file_storage_path}")
-            else:
-                print(f"File not found: {self.current_etf_file_storage_path}")
-        except Exception as e:
-            print(f"Error removing file: {e}")
-        
 
+    @timed('rsi2.scrape')
     def scrape(self) -> None: 
         if self.should_scrape():
-            self.remove_previous_day_file()
-            data_list = []
-    
-            url = "https://www.etfscreen.com/performance.php?wl=0&s=Rtn-1mo%7Cdesc&t=6&d=i&ftS=yes&ftL=yes&vFf=dolVol21&vFl=gt&vFv=1000000&udc=default&d=i"
-            response = requests.get(url=url)
-    
-            if response.status_code != 200:
-                print(f"Error in getting response: {response.status_code}")
+            # fixed before the request so a scrape running past midnight is still stored under its own day
+            snapshot_path = self.new_etf_snapshot_path
+            try:
+                page = self.fetcher.fetch(self.screen_url)
+            except requests.RequestException as e:
+                print(f"Error in getting response: {e}")
                 return None
     
-            soup = BeautifulSoup(response.content, "html.parser")
-            table_div = soup.find('div', class_="ptbl")
-    
-            if table_div:
-                table = table_div.find('table', class_="ptbl")
-        
-                if table:
-                    table_rows = table.find_all('tr')
+            if page.status_code not in (200, 304):
+                print(f"Error in getting response: {page.status_code}")
+                return None
             
-                    for table_row in range(len(table_rows)):
-                        curr_row = table_rows[table_row]
-                        table_row_data = curr_row.find_all('td')
-                        data_dict = {}
-                
-                        for index, val in enumerate(COLUMN_HEADINGS):
-                            if index < len(table_row_data):
-                                data_dict[val] = table_row_data[index].text.strip()
-                        data_list.append(data_dict)
+            data_list = self.parse_scrape(page.content)
             
             if len(data_list) == 0:
                 print("Error: no data found")
                 return None
             
-            df = pd.DataFrame.from_dict(data=data_list)
-            df = df.drop(index=[0,1])
-            
-            df.to_csv(self.new_etf_file_storage_path)
+            # the first two rows are the table's headings, earlier snapshots are kept for research (load_snapshots)
+            write_snapshot(snapshot_path, data_list[2:])
     
-    def validate_scrape(self) -> None:
+    def parse_scrape(self, content: bytes) -> List[dict]:
         """
-        Ensures that all columns are present in the data
+        Reads the rows of the etf screen table, one dict of cell text by column heading per row
+        
+        Only the table's rows are walked with lxml's C parser, header rows give empty dicts. An empty or
+        unparsable page gives no rows
         """
-        for column in COLUMN_HEADINGS:
-            if column == 'Check_box':
-                continue
-            if column not in self.scraped_etfs.columns:
-                raise ValueError(f"Missing required column: {column}")
-                
+        if not content or not content.strip():
+            return []
+        try:
+            document = html.fromstring(content)
+        except etree.ParserError as e:
+            print(f"Error parsing the etf screen: {e}")
+            return []
+        
+        data_list = []
+        for table_row in document.xpath(SCREEN_ROWS):
+            table_row_data = table_row.xpath('.//td')
+            data_list.append({val: table_row_data[index].text_content().strip()
+                              for index, val in enumerate(COLUMN_HEADINGS) if index < len(table_row_data)})
+        return data_list
     
-    def process_scrape(self) -> None:
+    @timed('rsi2.process_scrape')
+    def process_scrape(self, snapshot_path: Optional[str] = None) -> None:
         """
         Preprocesses the data that was scraped
-        """
-        self.scraped_etfs = pd.read_csv(self.new_etf_file_storage_path)
-        self.scraped_etfs = self.scraped_etfs.drop(columns=['Check_box'])
-        self.validate_scrape()
         
-        self.scraped_etfs = self.scraped_etfs[~self.scraped_etfs['Name'].str.contains('vix', case=False)]
-        self.scraped_etfs = self.scraped_etfs[~self.scraped_etfs['Name'].str.contains('etn', case=False)]
+        Args:
+            snapshot_path (Optional[str]): snapshot to read, today's if None
+        """
+        snapshot = read_snapshot(snapshot_path if snapshot_path is not None else self.new_etf_snapshot_path)
         
-        self.scraped_etfs['RSf'] = self.scraped_etfs['RSf'].astype('float')
-        self.scraped_etfs['Rtn-1d'] = self.scraped_etfs['Rtn-1d'].astype('float')
-        self.scraped_etfs['Rtn-5d'] = self.scraped_etfs['Rtn-5d'].astype('float')
-        self.scraped_etfs['Rtn-1mo'] = self.scraped_etfs['Rtn-1mo'].astype('float')
-        self.scraped_etfs['Rtn-3mo'] = self.scraped_etfs['Rtn-3mo'].astype('float')
-        self.scraped_etfs['Rtn-6mo'] = self.scraped_etfs['Rtn-6mo'].astype('float')
-        self.scraped_etfs['Rtn-1yr'] = self.scraped_etfs['Rtn-1yr'].astype('float')
+        # filtered on the memory mapped columns, only the kept rows are copied into the dataframe
+        names = np.char.lower(snapshot['Name'])
+        keep = (np.char.find(names, 'vix') < 0) & (np.char.find(names, 'etn') < 0) & (snapshot['RSf'] >= 80)
+        self.scraped_etfs = pd.DataFrame({column: values[keep] for column, values in snapshot.items()})
         
-        self.scraped_etfs = self.scraped_etfs[self.scraped_etfs['RSf'] >= 80]
         self.scraped_etfs = self.scraped_etfs.sort_values('Rtn-1mo', ascending=True)
         self.scraped_etfs = self.scraped_etfs[:25] # might need to update this after we test further
         
     
+    @timed('rsi2.download_stock_data')
+    def download_stock_data(self, ticker_list: List[str], start: datetime) -> pd.DataFrame:
+        """
+        Downloads the daily bars from start up to (not including) today, see strategy.download_bars
+        """
+        return download_bars(ticker_list, start)
+    
+    def universe(self) -> List[str]:
+        """
+        Scrapes the etf screen if today's snapshot is missing and returns the etfs it keeps
+        
+        Before 12:50, or when today's scrape failed, the latest earlier snapshot is used instead
+        
+        Raises:
+            FileNotFoundError: if no snapshot was ever scraped
+        """
+        self.scrape()
+        snapshot_path = self.latest_snapshot_path()
+        if snapshot_path is None:
+            raise FileNotFoundError(f"No etf screen snapshot in {self.etf_snapshot_dir}")
+        
+        if snapshot_path != self.new_etf_snapshot_path:
+            print(f"Using the etf screen snapshot {os.path.basename(snapshot_path)}, today's is not scraped yet")
+        self.process_scrape(snapshot_path)
+        return self.scraped_etfs['Symbol'].tolist()
+    
     def set_stock_data(self) -> None:
         """
         Setter that grabs all price data for each etf stock scraped
         """
         ticker_list = self.scraped_etfs['Symbol'].tolist()
-        self.stock_data = yf.download(tickers=ticker_list, start=datetime.today() - timedelta(days=365), end=datetime.today())
-        self.stock_data = self.stock_data.stack().reset_index().rename(index=str, columns={"level_1": "Ticker"}).sort_values(['Ticker', 'Date'])
-        self.stock_data['Date'] = pd.to_datetime(self.stock_data['Date'])
-        self.stock_data.set_index('Date', inplace=True)
+        self.stock_data = self.download_stock_data(ticker_list, start=datetime.today() - self.lookback)
     
+    @timed('rsi2.add_ta')
     def add_ta(self, stock_data: pd.DataFrame) -> pd.DataFrame:
-        stock_data[['donchian_lower', 'donchian_middle', 'donchian_upper']] = pandas_ta.donchian(
-            high=stock_data['High'], # update to high for the real time day
-            low=stock_data['Low'], # update to low for the  real time day
+        """
+        Adds the 55 day Donchian channels and the RSI(2) for every ticker in stock_data at once
+        """
+        engine = IndicatorEngine(stock_data)
+        
+        donchian_lower, donchian_middle, donchian_upper = indicators.donchian(
+            high=engine.wide('High'), # update to high for the real time day
+            low=engine.wide('Low'), # update to low for the  real time day
             upper_length=55,
             lower_length=55
         )
+        stock_data['donchian_lower'] = engine.long(donchian_lower)
+        stock_data['donchian_middle'] = engine.long(donchian_middle)
+        stock_data['donchian_upper'] = engine.long(donchian_upper)
         
-        stock_data['rsi2'] = pandas_ta.rsi(
-            close=stock_data['Close'], # need to update to real time price
+        stock_data['rsi2'] = engine.long(indicators.rsi(
+            close=engine.wide('Close'), # need to update to real time price
             length=2
-        )
+        ))
         
         return stock_data
     
+    @timed('rsi2.filter_by_ta')
     def filter_by_ta(self) -> None:
-        self.stock_data = self.stock_data.groupby('Ticker').apply(self.add_ta)
+        self.stock_data = self.add_ta(self.stock_data)
+        # (Ticker, Date) index with the Ticker column kept, the layout groupby('Ticker').apply used to produce
+        self.stock_data.index = pd.MultiIndex.from_arrays([self.stock_data['Ticker'], self.stock_data.index],
+                                                          names=['Ticker', 'Date'])
         self.stock_data = self.stock_data.dropna()
         
         self.stock_data['at_donchian_upper'] = self.stock_data['High'] >= self.stock_data['donchian_upper']
@@ -189,23 +217,88 @@ class Rsi2(Strategy):
         self.stock_data['sell_signal'] = False
         
     
+    @timed('rsi2.generate_buy_signal')
     def generate_buy_signal(self) -> None:
-        for ticker in self.stock_data['Ticker'].unique():
-            ticker_data = self.stock_data[self.stock_data['Ticker'] == ticker]
-            donchian_upper_days = ticker_data[ticker_data['at_donchian_upper']].index
-            
-            for upper_day in donchian_upper_days:
-                subsequent_days = ticker_data.loc[upper_day:].index
-                
-                for day in subsequent_days:
-                    if ticker_data.loc[day, 'below_30_rsi2']:
-                        self.stock_data.loc[day, 'buy_signal'] = True
-                        break
+        """
+        Marks the first day at or after each Donchian upper touch where the RSI(2) is at or below 30
+        
+        A touch arms the ticker and the next oversold day (the touch day included) is the buy. The oversold
+        days split each ticker's history into segments, so a day is a buy when it is oversold and its segment,
+        everything after the previous oversold day, contains a touch.
+        """
+        tickers = self.stock_data['Ticker']
+        oversold = self.stock_data['below_30_rsi2'].astype(int)
+        
+        # number of oversold days strictly before each row, per ticker
+        segment = oversold.groupby(tickers).cumsum() - oversold
+        armed = self.stock_data['at_donchian_upper'].astype(int).groupby([tickers, segment]).cummax().astype(bool)
+        
+        self.stock_data['buy_signal'] = self.stock_data['below_30_rsi2'] & armed
     
     def sell_signal(self) -> None:
         pass
     
+    def load_state(self) -> Dict[str, 'Rsi2State']:
+        """
+        Reads the per ticker indicator state saved by the last incremental run
+        """
+        if not os.path.exists(self.etf_state_storage_path):
+            return {}
+        
+        with open(self.etf_state_storage_path) as file:
+            return {ticker: Rsi2State.from_dict(state) for ticker, state in json.load(file).items()}
+    
+    def save_state(self, state: Dict[str, 'Rsi2State']) -> None:
+        """
+        Writes the per ticker indicator state, replacing the previous file in one step
+        """
+        temp_path = f"{self.etf_state_storage_path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({ticker: ticker_state.to_dict() for ticker, ticker_state in state.items()}, file)
+        os.replace(temp_path, self.etf_state_storage_path)
+    
+    @timed('rsi2.run_incremental')
+    def run_incremental(self) -> None:
+        """
+        Incremental alternative to set_stock_data, filter_by_ta and generate_buy_signal
+        
+        Tickers seen before only download the bars since their last processed day and feed them through the
+        saved Wilder averages, Donchian windows and armed flag. New tickers are bootstrapped from a year of bars.
+        Leaves one row per processed bar in stock_data, in the layout postprocess expects.
+        """
+        ticker_list = self.scraped_etfs['Symbol'].tolist()
+        state = self.load_state()
+        
+        known_tickers = [ticker for ticker in ticker_list if ticker in state]
+        new_tickers = [ticker for ticker in ticker_list if ticker not in state]
+        
+        frames = []
+        if new_tickers:
+            frames.append(self.download_stock_data(new_tickers, start=datetime.today() - self.lookback))
+        if known_tickers:
+            start = min(state[ticker].last_date for ticker in known_tickers) + timedelta(days=1)
+            if start < datetime.today().date():
+                frames.append(self.download_stock_data(known_tickers, start=datetime.combine(start, time())))
+        
+        rows = []
+        for frame in frames:
+            for ticker, bars in frame.groupby('Ticker'):
+                ticker_state = state.setdefault(ticker, Rsi2State())
+                for day, (high, low, close) in zip(bars.index, bars[['High', 'Low', 'Close']].to_numpy(dtype=float)):
+                    if ticker_state.last_date is not None and day.date() <= ticker_state.last_date:
+                        continue
+                    rows.append((ticker, day, ticker_state.update(day.date(), high, low, close)))
+        
+        self.stock_data = pd.DataFrame(rows, columns=['Ticker', 'Date', 'buy_signal'])
+        self.stock_data.index = pd.MultiIndex.from_arrays([self.stock_data['Ticker'], self.stock_data.pop('Date')],
+                                                          names=['Ticker', 'Date'])
+        self.save_state(state)
+    
+    @timed('rsi2.postprocess')
     def postprocess(self) -> None:
+        """
+        Stores today's buys in the signals table, replacing an earlier run of the same day
+        """
         buys = self.stock_data[self.stock_data['buy_signal'] == True]
         
         buys = buys.drop(columns=['Ticker'])
@@ -215,13 +308,61 @@ class Rsi2(Strategy):
         today = pd.Timestamp(datetime.now().date())
         buys = buys[buys['Date'] == today]
         
-        with open(self.etf_buys_storage_path, 'w') as file:
-            json.dump(buys.to_dict(orient='records'), file)
+        signal_store.store(strategy='rsi2', day=today.date(), ticker_list=buys['Ticker'].tolist())
+
+class Rsi2State:
+    """
+    Everything the RSI2 signal needs to process the next bar of one ticker
+    
+    @last_date: day of the last processed bar
+    @donchian: the last 55 highs and lows
+    @rsi: last close and the Wilder averages of gains and losses
+    @armed: the Donchian upper channel was touched since the last RSI(2) <= 30 day
+    """
+    
+    def __init__(self,
+                 last_date: Optional[date] = None,
+                 donchian: Optional[DonchianState] = None,
+                 rsi: Optional[RsiState] = None,
+                 armed: bool = False) -> None:
+        self.last_date = last_date
+        self.donchian = donchian if donchian is not None else DonchianState(upper_length=55, lower_length=55)
+        self.rsi = rsi if rsi is not None else RsiState(length=2)
+        self.armed = armed
+    
+    def update(self, day: date, high: float, low: float, close: float) -> bool:
+        """
+        Feeds the next bar through the indicators, returns True if it is a buy
+        
+        Bars before every indicator is defined are skipped the way filter_by_ta drops them, then the rule
+        matches generate_buy_signal: a touch arms the ticker and the next oversold bar is the buy.
+        """
+        self.last_date = day
+        _, _, donchian_upper = self.donchian.update(high, low)
+        rsi2 = self.rsi.update(close)
+        
+        if pd.isna(donchian_upper) or pd.isna(rsi2):
+            return False
+        
+        if high >= donchian_upper:
+            self.armed = True
+        
+        buy = self.armed and rsi2 <= 30
+        if rsi2 <= 30:
+            self.armed = False
+        return buy
+    
+    def to_dict(self) -> dict:
+        return {'last_date': self.last_date.isoformat() if self.last_date is not None else None,
+                'donchian': self.donchian.to_dict(), 'rsi': self.rsi.to_dict(), 'armed': self.armed}
+    
+    @classmethod
+    def from_dict(cls, state: dict) -> 'Rsi2State':
+        return cls(last_date=date.fromisoformat(state['last_date']) if state['last_date'] else None,
+                   donchian=DonchianState.from_dict(state['donchian']),
+                   rsi=RsiState.from_dict(state['rsi']),
+                   armed=state['armed'])
 
-# rsi2 = Rsi2()
-# rsi2.scrape()
-# rsi2.process_scrape()
-# rsi2.set_stock_data()
-# rsi2.filter_by_ta()
-# rsi2.generate_buy_signal()
-# data = rsi2.postprocess()
\ No newline at end of file
+# the daily run is scheduled by run_strategies.py (runner.StrategyRunner), which downloads the bars and runs
+# filter_by_ta, generate_buy_signal and postprocess. Once the state file exists, run_incremental can replace
+# set_stock_data/filter_by_ta/generate_buy_signal for a single strategy run
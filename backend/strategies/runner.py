@@ -0,0 +1,189 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from time import sleep
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from ..config.config import config_dict
+from .strategy import Strategy, download_bars
+
+# (one array per bar column, dates, bar columns, rows of each ticker) of the shared panel, set by attach_panel
+PANEL = None
+
+
+def attach_panel(directory: str, columns: List[str], rows: Dict[str, Tuple[int, int]]) -> None:
+    """
+    Pool initializer, maps the bars written by the parent read only instead of copying them
+    """
+    global PANEL
+    PANEL = ([np.load(os.path.join(directory, f"column_{i}.npy"), mmap_mode='r') for i in range(len(columns))],
+             np.load(os.path.join(directory, 'dates.npy'), mmap_mode='r'),
+             columns,
+             rows)
+
+
+def panel_bars(ticker_list: List[str], start: datetime) -> pd.DataFrame:
+    """
+    Copies the bars of some tickers from start on out of the shared panel, in the layout download_bars returns
+    """
+    arrays, dates, columns, rows = PANEL
+    frames = []
+    for ticker in sorted(set(ticker_list)):
+        if ticker not in rows:
+            continue
+        first, last = rows[ticker]
+        first += int(np.searchsorted(dates[first:last], np.datetime64(start, 'ns')))
+        bars = {column: np.array(array[first:last]) for column, array in zip(columns, arrays)}
+        frames.append(pd.DataFrame({'Ticker': ticker, **bars}, index=pd.DatetimeIndex(np.array(dates[first:last]), name='Date')))
+
+    if not frames:
+        return pd.DataFrame(columns=['Ticker', *columns], index=pd.DatetimeIndex([], name='Date'))
+    return pd.concat(frames)
+
+
+def run_strategy(task: Tuple[str, Strategy, List[str], datetime]) -> Tuple[str, Optional[pd.DataFrame], Optional[str]]:
+    """
+    Runs filter_by_ta and generate_buy_signal of one strategy on its tickers of the shared panel
+
+    Returns:
+        Tuple[str, Optional[pd.DataFrame], Optional[str]]: name, the strategy's stock_data and the error if it failed
+    """
+    name, strategy, ticker_list, start = task
+    try:
+        strategy.stock_data = panel_bars(ticker_list, start)
+        strategy.filter_by_ta()
+        strategy.generate_buy_signal()
+        return name, strategy.stock_data, None
+    except Exception as e:
+        return name, None, str(e)
+
+
+class StrategyRunner:
+    """
+    Runs any number of strategies on one download of the bars they need
+
+    The universes of the registered strategies are gathered first and the union of their tickers is downloaded
+    once, over the longest lookback. The bars are written to memory mapped files shared read only by a pool of
+    processes, one task per strategy, and postprocess runs in the parent on each strategy's signals.
+    """
+
+    def __init__(self,
+                 processes: Optional[int] = None,
+                 downloader: Callable[[List[str], datetime], pd.DataFrame] = download_bars) -> None:
+        """
+        Constructor for the StrategyRunner class
+
+        @processes: pool size, one process per strategy up to the number of CPU cores if None
+        @downloader: downloads the daily bars of a list of tickers from a start date, see strategy.download_bars
+        @strategies: registered strategies by name
+        """
+        self.processes = processes
+        self.downloader = downloader
+        self.strategies: Dict[str, Strategy] = {}
+
+    def register(self, strategy: Strategy, name: Optional[str] = None) -> None:
+        """
+        Adds a strategy to every run, under its class name unless a name is given
+        """
+        name = name or type(strategy).__name__
+        if name in self.strategies:
+            raise ValueError(f"A strategy named {name} is already registered")
+        self.strategies[name] = strategy
+
+    def run(self) -> Dict[str, Optional[str]]:
+        """
+        Runs every registered strategy once
+
+        Returns:
+            Dict[str, Optional[str]]: error of each strategy by name, None for the ones that succeeded
+        """
+        errors: Dict[str, Optional[str]] = {}
+        universes: Dict[str, List[str]] = {}
+        for name, strategy in self.strategies.items():
+            try:
+                universes[name] = strategy.universe()
+            except Exception as e:
+                errors[name] = str(e)
+
+        if not universes:
+            return errors
+
+        today = datetime.combine(datetime.today().date(), time())
+        starts = {name: today - self.strategies[name].lookback for name in universes}
+        union = sorted({ticker for ticker_list in universes.values() for ticker in ticker_list})
+        bars = self.downloader(union, min(starts.values())) if union else pd.DataFrame(columns=['Ticker'])
+
+        # the long layout is sorted by ticker then date, so every ticker is one contiguous block of rows
+        columns = [column for column in bars.columns if column != 'Ticker']
+        tickers, first_rows = np.unique(bars['Ticker'].to_numpy(dtype=str), return_index=True)
+        last_rows = np.r_[first_rows[1:], len(bars)]
+        rows = {ticker: (int(first), int(last)) for ticker, first, last in zip(tickers, first_rows, last_rows)}
+
+        with tempfile.TemporaryDirectory() as directory:
+            for i, column in enumerate(columns):
+                np.save(os.path.join(directory, f"column_{i}.npy"), bars[column].to_numpy())
+            np.save(os.path.join(directory, 'dates.npy'), pd.DatetimeIndex(bars.index).to_numpy(dtype='datetime64[ns]'))
+
+            processes = min(len(universes), self.processes or os.cpu_count())
+            tasks = [(name, self.strategies[name], universes[name], starts[name]) for name in universes]
+
+            # spawn so no pool process inherits the parent's database connections
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=attach_panel,
+                                     initargs=(directory, columns, rows)) as pool:
+                for name, stock_data, error in pool.map(run_strategy, tasks):
+                    if error is not None:
+                        errors[name] = error
+                        continue
+
+                    try:
+                        self.strategies[name].stock_data = stock_data
+                        self.strategies[name].postprocess()
+                        errors[name] = None
+                    except Exception as e:
+                        errors[name] = str(e)
+
+        return errors
+
+
+def next_run(schedule: Sequence[time], now: datetime) -> datetime:
+    """
+    Returns the first scheduled time after now, tomorrow's first one when today's have all passed
+    """
+    today = [datetime.combine(now.date(), at) for at in sorted(schedule)]
+    upcoming = [run_at for run_at in today if run_at > now]
+    return upcoming[0] if upcoming else today[0] + timedelta(days=1)
+
+
+def run_scheduled(runner: StrategyRunner, config: type = config_dict['dev'], once: bool = False) -> None:
+    """
+    Runs the strategies every day at the STRATEGY_SCHEDULE times of the config, or once right away
+
+    Args:
+        runner (StrategyRunner): runner with its strategies registered
+        config (type): config class the app is created with, strategies store their signals through it
+        once (bool): run immediately and return, i.e. from a cron entry
+    """
+    from .. import create_app
+
+    app = create_app(config=config)
+    schedule = [datetime.strptime(at.strip(), '%H:%M').time() for at in app.config['STRATEGY_SCHEDULE'].split(',')]
+    runner.processes = runner.processes or app.config['STRATEGY_WORKERS']
+
+    with app.app_context():
+        while True:
+            if not once:
+                sleep(max(0.0, (next_run(schedule, datetime.now()) - datetime.now()).total_seconds()))
+
+            for name, error in runner.run().items():
+                if error is not None:
+                    print(f"Error running {name}: {error}")
+                else:
+                    print(f"Ran {name}")
+
+            if once:
+                return
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+from typing import List
+from flask import Flask
+from sqlalchemy import insert, select
+from ..models.signals import Signal
+from ..utils import db
+from ..utils.cache import TTLCache
+
+
+class SignalStore:
+    """
+    Reads and writes strategy signals in the signals table, caching each strategy's signals for today
+
+    The cache is per process: the worker that stores a run drops its entry right away, the other workers and
+    hosts serve the new run once their entry is older than SIGNAL_CACHE_TTL.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the SignalStore class, the cache is sized in init_app
+        """
+        self.cache = TTLCache(max_size=64, ttl=60)
+
+    def init_app(self, app: Flask) -> None:
+        self.cache = TTLCache(max_size=64, ttl=app.config.get('SIGNAL_CACHE_TTL', 60))
+
+    def store(self, strategy: str, day: date, ticker_list: List[str], signal: str = 'buy') -> None:
+        """
+        Replaces a strategy's signals of one kind for one day, so running a strategy again the same day overwrites
+        its run. Buys and sells of the same ticker are kept apart
+
+        Args:
+            strategy (str): name of the strategy
+            day (date): trading day of the signals
+            ticker_list (List[str]): tickers signaled that day
+            signal (str): 'buy' or 'sell'
+        """
+        created_at = datetime.utcnow()
+        rows = [{'strategy': strategy, 'date': day, 'ticker': ticker, 'signal': signal, 'created_at': created_at}
+                for ticker in dict.fromkeys(ticker_list)]
+
+        try:
+            Signal.query.filter(Signal.strategy == strategy, Signal.date == day, Signal.signal == signal) \
+                .delete(synchronize_session=False)
+            if rows:
+                db.session.execute(insert(Signal), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self.cache.delete(f"{strategy}:{day.isoformat()}")
+
+    def between(self, strategy: str, start: date, end: date) -> List[dict]:
+        """
+        Returns a strategy's signals from start to end, both included, ordered by date then ticker
+
+        Returns:
+            List[dict]: Date (ISO format), Ticker and Signal of every signal
+        """
+        rows = db.session.execute(select(Signal.date, Signal.ticker, Signal.signal)
+                                  .where(Signal.strategy == strategy, Signal.date >= start, Signal.date <= end)
+                                  .order_by(Signal.date, Signal.ticker))
+        return [{'Date': day.isoformat(), 'Ticker': ticker, 'Signal': signal} for day, ticker, signal in rows]
+
+    def today(self, strategy: str) -> List[dict]:
+        """
+        Returns a strategy's signals for today, from the cache when they were read less than SIGNAL_CACHE_TTL ago
+        """
+        day = date.today()
+        key = f"{strategy}:{day.isoformat()}"
+
+        signals = self.cache.get(key)
+        if signals is None:
+            signals = self.between(strategy, day, day)
+            self.cache.set(key, signals)
+        return signals
+
+
+signal_store = SignalStore()
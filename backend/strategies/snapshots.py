@@ -0,0 +1,118 @@
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# dtype of every stored column of the etf screen, fixed when a snapshot is written
+SNAPSHOT_COLUMNS = {
+    'Name': 'U96',
+    'Symbol': 'U12',
+    'RSf': 'f8',
+    'Rtn-1d': 'f8',
+    'Rtn-5d': 'f8',
+    'Rtn-1mo': 'f8',
+    'Rtn-3mo': 'f8',
+    'Rtn-6mo': 'f8',
+    'Rtn-1yr': 'f8',
+    '$vol-21': 'U16'
+}
+
+# name of a snapshot directory, the time of the scrape
+SNAPSHOT_FORMAT = "%Y%m%d-%H%M"
+
+
+def write_snapshot(path: str, rows: List[dict]) -> None:
+    """
+    Writes one scrape as a directory with one .npy file per column
+
+    Numeric columns are parsed once here, cells that are missing or not numbers are stored as NaN. Text longer
+    than its column's width is truncated.
+
+    Args:
+        path (str): snapshot directory, replaced if it exists
+        rows (List[dict]): cell text by column heading, one dict per etf
+
+    Raises:
+        ValueError: if no row has one of the columns of SNAPSHOT_COLUMNS
+    """
+    for column in SNAPSHOT_COLUMNS:
+        if not any(column in row for row in rows):
+            raise ValueError(f"Missing required column: {column}")
+
+    # written next to the final directory and renamed, so a reader never sees half a snapshot
+    temp_path = f"{path}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    for column, dtype in SNAPSHOT_COLUMNS.items():
+        values = [row.get(column, '') for row in rows]
+        if np.dtype(dtype).kind == 'f':
+            values = pd.to_numeric(pd.Series(values, dtype=object).str.replace(',', ''), errors='coerce')
+        np.save(os.path.join(temp_path, f"{column}.npy"), np.asarray(values, dtype=dtype))
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str, columns: Optional[List[str]] = None, mmap_mode: Optional[str] = 'r') -> Dict[str, np.ndarray]:
+    """
+    Reads the columns of a snapshot, memory mapped by default so nothing is read until it is used
+
+    Args:
+        path (str): snapshot directory
+        columns (Optional[List[str]]): columns to read, all of SNAPSHOT_COLUMNS if None
+        mmap_mode (Optional[str]): 'r' to map the files read only, None to read them into memory
+
+    Returns:
+        Dict[str, np.ndarray]: one array per column, in SNAPSHOT_COLUMNS order
+    """
+    columns = list(SNAPSHOT_COLUMNS) if columns is None else columns
+    return {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mmap_mode) for column in columns}
+
+
+def snapshot_times(directory: str) -> List[datetime]:
+    """
+    Returns the time of every snapshot in directory, oldest first
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    times = []
+    for name in os.listdir(directory):
+        try:
+            times.append(datetime.strptime(name, SNAPSHOT_FORMAT))
+        except ValueError:
+            continue
+    return sorted(times)
+
+
+def load_snapshots(directory: str,
+                   start: Optional[datetime] = None,
+                   end: Optional[datetime] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Stacks the snapshots scraped between start and end, i.e. to study months of screens
+
+    Args:
+        directory (str): directory holding the snapshot directories
+        start (Optional[datetime]): first scrape time included, the oldest snapshot if None
+        end (Optional[datetime]): last scrape time included, the newest snapshot if None
+        columns (Optional[List[str]]): columns to read, all of SNAPSHOT_COLUMNS if None
+
+    Returns:
+        pd.DataFrame: the requested columns with a Timestamp column holding the time of each row's scrape
+    """
+    columns = list(SNAPSHOT_COLUMNS) if columns is None else columns
+    frames = []
+    for time in snapshot_times(directory):
+        if (start is not None and time < start) or (end is not None and time > end):
+            continue
+        snapshot = read_snapshot(os.path.join(directory, time.strftime(SNAPSHOT_FORMAT)), columns)
+        frames.append(pd.DataFrame({'Timestamp': pd.Timestamp(time), **snapshot}))
+
+    if not frames:
+        return pd.DataFrame({'Timestamp': pd.Series(dtype='datetime64[ns]'),
+                             **{column: np.empty(0, dtype=SNAPSHOT_COLUMNS[column]) for column in columns}})
+    return pd.concat(frames, ignore_index=True)
@@ -1,18 +1,51 @@
 from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List
 import pandas as pd
 
+
+def download_bars(ticker_list: List[str], start: datetime) -> pd.DataFrame:
+    """
+    Downloads the daily bars from start up to (not including) today
+
+    Returns:
+        pd.DataFrame: one row per ticker and day indexed by Date with a Ticker column, sorted by ticker then date
+    """
+    import yfinance as yf
+    stock_data = yf.download(tickers=ticker_list, start=start, end=datetime.today())
+    stock_data = stock_data.stack().reset_index().rename(index=str, columns={"level_1": "Ticker"}).sort_values(['Ticker', 'Date'])
+    stock_data['Date'] = pd.to_datetime(stock_data['Date'])
+    stock_data.set_index('Date', inplace=True)
+    return stock_data
+
+
 class Strategy(ABC):
     """
     Abstract class to define methods used from all other stock strategies implemented
+    
+    @lookback: history of daily bars the strategy's indicators need, StrategyRunner downloads the longest one
     """
     
+    lookback = timedelta(days=365)
+    
+    @abstractmethod
+    def universe(self) -> List[str]:
+        """
+        Tickers the strategy trades today, StrategyRunner downloads the union of every strategy's universe once
+
+        Returns:
+            List[str]: tickers whose bars the strategy needs in stock_data
+        """
+        pass
+    
     @abstractmethod
     def add_ta(self, stock_data: pd.DataFrame) -> pd.DataFrame:
         """
-        Adds technical analysis to a stock for the strategy
+        Adds technical analysis to the stocks for the strategy, indicators.IndicatorEngine computes
+        an indicator for every ticker at once
 
         Args:
-            stock_data (pd.DataFrame): a dataframe consisting of stock prices
+            stock_data (pd.DataFrame): a dataframe consisting of stock prices with a Ticker column
 
         Returns:
             pd.DataFrame: a dataframe with the technical analysis as a column
@@ -1,27 +1,39 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource
 from flask_jwt_extended import jwt_required
+from flask import request
+from datetime import date
 from http import HTTPStatus
-import json
-import os
+from .signals import signal_store
 
 strategies_namespace = Namespace('strategies', description="Strategies namespace")
 
+# longest date range served by a single request
+MAX_RANGE_DAYS = 366
+
 
 @strategies_namespace.route('/rsi2')
 class Rsi2Endpoint(Resource):
-    
+
+    @strategies_namespace.doc(params={'start': 'First day, YYYY-MM-DD (default today)',
+                                      'end': 'Last day, YYYY-MM-DD (default start)'})
     @jwt_required(refresh=True)
     def get(self):
-        
-        file_path = f"{os.getcwd()}/buys"
-        
-        if not os.path.exists(file_path):
-            return {"message": "File not found"}, HTTPStatus.NOT_FOUND
-        
-        if os.path.getsize(file_path) == 0:
-            return {"message": "No buys today"}, HTTPStatus.OK
-        
-        with open(f"{os.getcwd()}/buys") as file:
-            data = json.load(file)
-        
-        return data, HTTPStatus.OK
\ No newline at end of file
+
+        if 'start' not in request.args and 'end' not in request.args:
+            buys = signal_store.today(strategy='rsi2')
+
+            if len(buys) == 0:
+                return {"message": "No buys today"}, HTTPStatus.OK
+
+            return buys, HTTPStatus.OK
+
+        try:
+            start = date.fromisoformat(request.args.get('start', date.today().isoformat()))
+            end = date.fromisoformat(request.args.get('end', start.isoformat()))
+        except ValueError:
+            return {"message": "start and end must be dates formatted YYYY-MM-DD"}, HTTPStatus.BAD_REQUEST
+
+        if end < start or (end - start).days >= MAX_RANGE_DAYS:
+            return {"message": f"end must be from start to {MAX_RANGE_DAYS} days after it"}, HTTPStatus.BAD_REQUEST
+
+        return signal_store.between(strategy='rsi2', start=start, end=end), HTTPStatus.OK
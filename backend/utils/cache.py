@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLCache:
+    """
+    In-process cache with least recently used eviction and a time to live per entry
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600) -> None:
+        """
+        Constructor for the TTLCache class
+
+        @max_size: most entries kept before the least recently used one is evicted
+        @ttl: seconds an entry stays valid after it was set
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored under key, None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores value under key, evicting the least recently used entry when full
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Removes the entry stored under key if there is one
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        """
+        Removes every entry whose key starts with prefix
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        Removes every entry
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class FileCache:
+    """
+    JSON file per entry in a shared directory so every worker on the host sees the same cache
+
+    Entries expire ttl seconds after they were written, reads refresh the access time used for
+    least recently used eviction. Keys are expected to look like "<prefix>:<rest>" so a prefix
+    can be dropped without opening any file.
+    """
+
+    def __init__(self, directory: str, max_size: int = 1024, ttl: float = 3600) -> None:
+        """
+        Constructor for the FileCache class
+
+        @directory: folder holding the cache files, created if missing
+        @max_size: most entries kept before the least recently used ones are evicted
+        @ttl: seconds an entry stays valid after it was set
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        prefix, _, rest = key.partition(':')
+        digest = hashlib.sha1(rest.encode()).hexdigest()
+        return os.path.join(self.directory, f"{prefix}.{digest}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored under key, None if it is missing or expired
+        """
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path) as file:
+                value = json.load(file)
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores value under key, evicting the least recently used entries when full
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(value, file)
+        # atomic so concurrent readers never see a half written file
+        os.replace(temp_path, path)
+
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        if len(entries) > self.max_size:
+            entries.sort(key=lambda entry: entry.stat().st_atime)
+            for entry in entries[:len(entries) - self.max_size]:
+                self._remove(entry.path)
+
+    def delete(self, key: str) -> None:
+        """
+        Removes the entry stored under key if there is one
+        """
+        self._remove(self._path(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        """
+        Removes every entry whose key prefix (the part before the first ':') is prefix
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(f"{prefix}."):
+                self._remove(entry.path)
+
+    def clear(self) -> None:
+        """
+        Removes every entry
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                self._remove(entry.path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
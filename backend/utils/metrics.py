@@ -0,0 +1,250 @@
+import hmac
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from flask import Flask, current_app, g, request
+
+# upper bounds in seconds of the histogram buckets, from a cache hit to a full history download
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PREFIX = 'portfolio_pilot_'
+
+DESCRIPTIONS = {
+    'stage_seconds': "Time spent in an instrumented stage, i.e. the holdings query, the price load or a solve",
+    'request_seconds': "Time spent handling an API request"
+}
+
+
+class Histogram:
+    """
+    Counts of observations per bucket with their sum, the layout of a Prometheus histogram
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        """
+        Constructor for the Histogram class
+
+        @buckets: sorted upper bounds, observations above the last one only count towards +Inf
+        @counts: observations per bucket, not cumulative
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Histograms keyed by metric name and labels, kept per process
+
+    Every gunicorn worker (and every batch pool process) holds its own registry, so each serves its own numbers.
+    """
+
+    def __init__(self) -> None:
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Records one observation of the metric name with the given labels
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+
+    def render(self) -> str:
+        """
+        Renders every histogram in the Prometheus text exposition format
+
+        Returns:
+            str: text served to a Prometheus scrape
+        """
+        with self._lock:
+            snapshot = sorted((key, list(histogram.counts), histogram.sum, histogram.count, histogram.buckets)
+                              for key, histogram in self.histograms.items())
+
+        lines = []
+        described = set()
+        for (name, labels), counts, total, count, buckets in snapshot:
+            metric = f"{PREFIX}{name}"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{metric}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {total!r}")
+            lines.append(f"{metric}_count{format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+registry = Registry()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Records the time spent in a block, or in every call of a function when used as a decorator
+
+        with timed('sharpe.solve'):
+            ...
+
+        @timed('rsi2.add_ta')
+        def add_ta(self, stock_data):
+            ...
+
+    Args:
+        stage (str): label of the stage_seconds histogram the time is recorded in
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval from a background thread
+
+    Only the sampled thread's frames are read, so the request runs unmodified. The result is the count of every
+    distinct stack in the collapsed format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005) -> None:
+        """
+        Constructor for the SamplingProfiler class
+
+        @thread_id: ident of the thread to sample
+        @interval: seconds between samples
+        @stacks: number of samples per collapsed stack, outermost frame first
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def collapsed(self) -> List[str]:
+        """
+        Returns one 'frame;frame;frame count' line per stack, most sampled first
+        """
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+
+def is_monitoring_token(token: Optional[str]) -> bool:
+    """
+    Checks a token against MONITORING_TOKEN, always False while MONITORING_TOKEN is unset
+
+    Args:
+        token (Optional[str]): token sent by the client
+
+    Returns:
+        bool: whether the client may read metrics and profiles or have its request profiled
+    """
+    expected = current_app.config.get('MONITORING_TOKEN')
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+class RequestMetrics:
+    """
+    Times every request into the request_seconds histogram and profiles the requests that ask for it
+
+    PROFILE_REQUESTS: allow a request sent with the MONITORING_TOKEN in an X-Profile header to be sampled by a
+    SamplingProfiler
+    PROFILE_INTERVAL: seconds between samples
+    PROFILE_HISTORY: most recent profiles kept for the monitoring namespace
+    """
+
+    def __init__(self) -> None:
+        self.profiles = deque(maxlen=20)
+
+    def init_app(self, app: Flask) -> None:
+        profile_requests = app.config.get('PROFILE_REQUESTS', False)
+        interval = app.config.get('PROFILE_INTERVAL', 0.005)
+        self.profiles = deque(maxlen=app.config.get('PROFILE_HISTORY', 20))
+
+        @app.before_request
+        def start_timer():
+            g.request_start = time.perf_counter()
+            if profile_requests and is_monitoring_token(request.headers.get('X-Profile')):
+                g.profiler = SamplingProfiler(thread_id=threading.get_ident(), interval=interval)
+                g.profiler.start()
+
+        @app.after_request
+        def record_request(response):
+            duration = time.perf_counter() - g.pop('request_start', time.perf_counter())
+            registry.observe('request_seconds', duration,
+                             endpoint=request.endpoint or 'unmatched',
+                             method=request.method,
+                             status=str(response.status_code))
+
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                profiler.stop()
+                self.profiles.appendleft({
+                    'path': request.full_path.rstrip('?'),
+                    'method': request.method,
+                    'status': response.status_code,
+                    'seconds': round(duration, 4),
+                    'samples': sum(profiler.stacks.values()),
+                    'stacks': profiler.collapsed()
+                })
+            return response
+
+        @app.teardown_request
+        def stop_profiler(exception):
+            # after_request is skipped when the request raised
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                profiler.stop()
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,74 @@
+from typing import List
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+# dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+# dialects whose INSERT supports ON DUPLICATE KEY UPDATE
+DUPLICATE_KEY_DIALECTS = ('mysql', 'mariadb')
+
+
+def upsert(model: db.Model, values: dict, index_elements: List[str], update_columns: List[str]) -> None:
+    """
+    Inserts a row or updates the existing row with the same unique key in a single statement
+
+    Databases with neither ON CONFLICT nor ON DUPLICATE KEY UPDATE go through update_or_insert instead.
+
+    Args:
+        model (db.Model): model of the table to write to
+        values (dict): column values of the row
+        index_elements (List[str]): columns of the unique index that identifies the row
+        update_columns (List[str]): columns overwritten when the row already exists
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in INSERTS:
+        statement = INSERTS[dialect](model).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+    elif dialect in DUPLICATE_KEY_DIALECTS:
+        # MySQL matches the row on any unique key of the table, index_elements only documents which one
+        statement = mysql.insert(model).values(**values)
+        statement = statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in update_columns}
+        )
+    else:
+        update_or_insert(model, values, index_elements, update_columns)
+        return
+
+    db.session.execute(statement)
+
+
+def update_or_insert(model: db.Model, values: dict, index_elements: List[str], update_columns: List[str]) -> None:
+    """
+    Portable upsert, updates the row with the same unique key and inserts it if there was none
+
+    The insert runs in a savepoint, so when a concurrent writer inserted the same key first only the savepoint
+    is rolled back and the row it wrote is updated instead.
+
+    Args:
+        model (db.Model): model of the table to write to
+        values (dict): column values of the row
+        index_elements (List[str]): columns of the unique index that identifies the row
+        update_columns (List[str]): columns overwritten when the row already exists
+    """
+    key = [getattr(model, column) == values[column] for column in index_elements]
+    changes = update(model).where(*key).values({column: values[column] for column in update_columns}) \
+        .execution_options(synchronize_session=False)
+
+    if db.session.execute(changes).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values(**values))
+    except IntegrityError:
+        db.session.execute(changes)
@@ -0,0 +1,32 @@
+"""
+Walk-forward backtest over 20 years of monthly rebalances, with and without warm starting the solves
+
+    python -m benchmarks.backtest
+"""
+import time
+from backend.optimizer.backtest import WalkForward
+from .synthetic import price_panel
+
+N_DAYS = 252 * 20
+
+
+def run(n_holdings: int, method: str) -> dict:
+    price_data = price_panel(n_tickers=n_holdings, n_days=N_DAYS)
+    result = {'holdings': n_holdings, 'method': method}
+
+    for warm_start in (False, True):
+        start = time.perf_counter()
+        backtest = WalkForward(price_data, method=method, lookback=252, warm_start=warm_start).run()
+        result['warm_s' if warm_start else 'cold_s'] = time.perf_counter() - start
+        result['rebalances'] = backtest['summary']['Rebalances']
+
+    return result
+
+
+if __name__ == "__main__":
+    print(f"{'holdings':>8} {'method':>8} {'rebalances':>10} {'cold (s)':>9} {'warm (s)':>9}")
+    for n_holdings in (10, 50):
+        for method in ('sharpe', 'sortino'):
+            result = run(n_holdings, method)
+            print(f"{result['holdings']:>8} {result['method']:>8} {result['rebalances']:>10} "
+                  f"{result['cold_s']:>9.2f} {result['warm_s']:>9.2f}")
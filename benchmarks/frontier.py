@@ -0,0 +1,28 @@
+"""
+Cost of a 50 point efficient frontier relative to a single max Sharpe solve
+
+    python -m benchmarks.frontier
+"""
+import timeit
+from backend.optimizer.sharpe import Sharpe
+from .synthetic import price_panel
+
+N_DAYS = 252 * 10
+N_POINTS = 50
+
+
+def run(n_holdings: int, number: int = 3) -> dict:
+    price_data = price_panel(n_tickers=n_holdings, n_days=N_DAYS)
+    sharpe = Sharpe(ticker_list=list(price_data.columns), price_data=price_data)
+
+    single = timeit.timeit(lambda: sharpe.optimize_portfolio(risk_free_rate=0.02), number=number) / number
+    frontier = timeit.timeit(lambda: sharpe.efficient_frontier(n_points=N_POINTS, risk_free_rate=0.02), number=number) / number
+
+    return {'holdings': n_holdings, 'single_s': single, 'frontier_s': frontier, 'ratio': frontier / single}
+
+
+if __name__ == "__main__":
+    print(f"{'holdings':>8} {'1 solve (s)':>12} {f'{N_POINTS} points (s)':>14} {'ratio':>7}")
+    for n_holdings in (10, 50):
+        result = run(n_holdings)
+        print(f"{result['holdings']:>8} {result['single_s']:>12.4f} {result['frontier_s']:>14.4f} {result['ratio']:>6.1f}x")
@@ -0,0 +1,66 @@
+"""
+Donchian(55) and RSI(2) for every ticker: per-ticker groupby().apply against the batched indicator engine
+
+    python -m benchmarks.indicators
+
+The per-ticker path uses pandas_ta when it is installed. Otherwise it uses the same pandas
+rolling/ewm calls pandas_ta makes, so the comparison still runs offline.
+"""
+import timeit
+import numpy as np
+import pandas as pd
+from backend.strategies.rsi2 import Rsi2
+from .synthetic import ohlc_panel
+
+N_DAYS = 252
+
+try:
+    import pandas_ta
+except ImportError:
+    pandas_ta = None
+
+
+def add_ta_per_ticker(stock_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    The indicators as Rsi2.add_ta computed them, one ticker group at a time
+    """
+    if pandas_ta is not None:
+        stock_data[['donchian_lower', 'donchian_middle', 'donchian_upper']] = pandas_ta.donchian(
+            high=stock_data['High'], low=stock_data['Low'], upper_length=55, lower_length=55)
+        stock_data['rsi2'] = pandas_ta.rsi(close=stock_data['Close'], length=2)
+        return stock_data
+
+    stock_data['donchian_lower'] = stock_data['Low'].rolling(55, min_periods=55).min()
+    stock_data['donchian_upper'] = stock_data['High'].rolling(55, min_periods=55).max()
+    stock_data['donchian_middle'] = 0.5 * (stock_data['donchian_lower'] + stock_data['donchian_upper'])
+
+    change = stock_data['Close'].diff()
+    gains = change.clip(lower=0).ewm(alpha=1 / 2, min_periods=2).mean()
+    losses = change.clip(upper=0).ewm(alpha=1 / 2, min_periods=2).mean().abs()
+    stock_data['rsi2'] = 100 * gains / (gains + losses)
+    return stock_data
+
+
+def run(n_tickers: int, number: int = 3) -> dict:
+    stock_data = ohlc_panel(n_tickers=n_tickers, n_days=N_DAYS)
+    rsi2 = Rsi2()
+
+    grouped = timeit.timeit(lambda: stock_data.groupby('Ticker', group_keys=False).apply(lambda group: add_ta_per_ticker(group.copy())),
+                            number=number) / number
+    batched = timeit.timeit(lambda: rsi2.add_ta(stock_data.copy()), number=number) / number
+
+    expected = stock_data.groupby('Ticker', group_keys=False).apply(lambda group: add_ta_per_ticker(group.copy()))
+    actual = rsi2.add_ta(stock_data.copy())
+    columns = ['donchian_lower', 'donchian_middle', 'donchian_upper', 'rsi2']
+    max_error = np.nanmax(np.abs(actual[columns].to_numpy() - expected[columns].to_numpy()))
+
+    return {'tickers': n_tickers, 'per_ticker_s': grouped, 'batched_s': batched, 'speedup': grouped / batched, 'max_error': max_error}
+
+
+if __name__ == "__main__":
+    print(f"per-ticker path: {'pandas_ta' if pandas_ta is not None else 'pandas rolling/ewm (pandas_ta not installed)'}")
+    print(f"{'tickers':>8} {'per ticker (s)':>15} {'batched (s)':>12} {'speedup':>8} {'max error':>10}")
+    for n_tickers in (25, 500, 5000):
+        result = run(n_tickers, number=1 if n_tickers >= 5000 else 3)
+        print(f"{result['tickers']:>8} {result['per_ticker_s']:>15.4f} {result['batched_s']:>12.4f} "
+              f"{result['speedup']:>7.0f}x {result['max_error']:>10.1e}")
@@ -0,0 +1,48 @@
+"""
+Per-evaluation cost of the Sortino objective before and after precomputing the returns array
+
+    python -m benchmarks.sortino_objective
+"""
+import timeit
+import numpy as np
+import pandas as pd
+from backend.optimizer.sortino import Sortino
+from .synthetic import price_panel
+
+N_DAYS = 252 * 20
+
+
+def legacy_neg_sortino(weights: np.ndarray, price_data: pd.DataFrame, mean_returns: pd.Series, risk_free_rate: float) -> float:
+    """
+    The objective as it was, rebuilding the log returns frame on every evaluation
+    """
+    log_returns = np.log(price_data / price_data.shift(1)).dropna()
+    portfolio_log_return = np.sum(mean_returns * weights) * 252
+    portfolio_simple_return = np.exp(portfolio_log_return) - 1
+    portfolio_log_returns = np.dot(log_returns, weights)
+    downside_returns = np.minimum(np.exp(portfolio_log_returns) - 1, 0)
+    downside_deviation = np.sqrt(np.mean(downside_returns**2)) * np.sqrt(252)
+    return -(portfolio_simple_return - risk_free_rate) / downside_deviation
+
+
+def run(n_holdings: int, number: int = 20) -> dict:
+    price_data = price_panel(n_tickers=n_holdings, n_days=N_DAYS)
+    sortino = Sortino(ticker_list=list(price_data.columns), price_data=price_data)
+
+    log_returns = np.log(sortino.price_data / sortino.price_data.shift(1)).dropna()
+    returns = np.ascontiguousarray(log_returns.values, dtype=np.float64)
+    mean_returns = returns.mean(axis=0)
+    buffer = np.empty(returns.shape[0])
+    weights = np.full(n_holdings, 1 / n_holdings)
+
+    before = timeit.timeit(lambda: legacy_neg_sortino(weights, sortino.price_data, log_returns.mean(), 0.02), number=number) / number
+    after = timeit.timeit(lambda: sortino.neg_sortino(weights, mean_returns, returns, 0.02, buffer), number=number * 50) / (number * 50)
+
+    return {'holdings': n_holdings, 'before_ms': before * 1e3, 'after_ms': after * 1e3, 'speedup': before / after}
+
+
+if __name__ == "__main__":
+    print(f"{'holdings':>8} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>8}")
+    for n_holdings in (10, 50, 200):
+        result = run(n_holdings)
+        print(f"{result['holdings']:>8} {result['before_ms']:>12.3f} {result['after_ms']:>12.3f} {result['speedup']:>7.0f}x")
@@ -0,0 +1,79 @@
+"""
+Cold start cost of the app factory, measured in fresh interpreters with python -X importtime
+
+    python -m benchmarks.startup
+
+Each scenario runs in its own process so nothing is already imported. The heaviest imports of each
+scenario are listed by their cumulative import time.
+"""
+import subprocess
+import sys
+from typing import List, Optional
+
+RUNS = 5
+TOP = 8
+
+APP = """
+import time
+start = time.perf_counter()
+from backend import create_app
+from backend.config.config import Config
+class StartupConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    JOB_STORE_PATH = ':memory:'
+create_app(StartupConfig, namespaces={namespaces})
+print(time.perf_counter() - start)
+"""
+
+IMPORT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+SCENARIOS = {
+    'app, all namespaces': APP.format(namespaces=None),
+    'app, auth + stocks': APP.format(namespaces=['auth', 'stocks']),
+    'first optimizer use': IMPORT.format(module='backend.optimizer.sharpe'),
+    'first strategy use': IMPORT.format(module='backend.strategies.rsi2')
+}
+
+
+def heaviest(importtime: str, top: int = TOP) -> List[tuple]:
+    """
+    Parses -X importtime output into (cumulative microseconds, top level package) pairs, heaviest first
+    """
+    packages = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        package = module.strip().split('.')[0]
+        # a package's own line carries the cumulative time of its submodules
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+    return sorted(((microseconds, package) for package, microseconds in packages.items()), reverse=True)[:top]
+
+
+def run(code: str, runs: int = RUNS) -> Optional[dict]:
+    timings = []
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+        if process.returncode != 0:
+            print(process.stderr.splitlines()[-1])
+            return None
+        timings.append(float(process.stdout.split()[-1]))
+
+    timings.sort()
+    return {'median_s': timings[len(timings) // 2], 'heaviest': heaviest(process.stderr)}
+
+
+if __name__ == "__main__":
+    for name, code in SCENARIOS.items():
+        result = run(code)
+        if result is None:
+            continue
+
+        print(f"{name}: {result['median_s'] * 1000:.0f} ms (median of {RUNS})")
+        for microseconds, package in result['heaviest']:
+            print(f"    {microseconds / 1000:>8.1f} ms  {package}")
@@ -0,0 +1,117 @@
+"""
+Latency of the stocks endpoints as the stocks table grows, on a seeded SQLite database
+
+    python -m benchmarks.stocks_load [rows ...]
+
+The scan column times the same per-user lookup with the index disabled (NOT INDEXED) for contrast.
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from flask_jwt_extended import create_refresh_token
+from backend import create_app
+from backend.config.config import Config
+from backend.utils import db
+
+HOLDINGS_PER_USER = 20
+N_TICKERS = 5000
+N_REQUESTS = 200
+
+
+def seed(connection, n_rows: int, seed: int = 0) -> int:
+    """
+    Inserts n_rows holdings spread over n_rows / HOLDINGS_PER_USER users, returns the number of users
+    """
+    rng = np.random.default_rng(seed)
+    n_users = max(n_rows // HOLDINGS_PER_USER, 1)
+
+    connection.executemany(
+        "INSERT INTO ticker_info (ticker, company_name, sector, industry, updated_at) "
+        "VALUES (?, ?, 'Sector', 'Industry', CURRENT_TIMESTAMP)",
+        ((f"T{i:04d}", f"Company {i}") for i in range(N_TICKERS))
+    )
+    connection.executemany(
+        "INSERT INTO users (id, first_name, last_name, username, email, password_hash, is_paid_member) "
+        "VALUES (?, 'first', 'last', ?, ?, 'x', 0)",
+        ((i, f"user{i}", f"user{i}@example.com") for i in range(1, n_users + 1))
+    )
+
+    def holdings():
+        for user_id in range(1, n_users + 1):
+            for ticker in rng.choice(N_TICKERS, HOLDINGS_PER_USER, replace=False):
+                yield user_id, f"T{ticker:04d}", float(rng.integers(1, 100)), float(rng.uniform(10, 500))
+
+    connection.executemany("INSERT INTO stocks (user_id, ticker, quantity, average_price) VALUES (?, ?, ?, ?)",
+                           holdings())
+    connection.commit()
+    return n_users
+
+
+def percentiles(timings: list) -> tuple:
+    milliseconds = np.array(timings) * 1000
+    return float(np.median(milliseconds)), float(np.percentile(milliseconds, 95))
+
+
+def run(n_rows: int, directory: str) -> dict:
+    class LoadConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, f'stocks_{n_rows}.db')}"
+        JWT_SECRET_KEY = 'benchmark-secret-key-of-sufficient-length'
+
+    app = create_app(LoadConfig)
+    client = app.test_client()
+    rng = np.random.default_rng(1)
+
+    with app.app_context():
+        db.create_all()
+        connection = db.engine.raw_connection()
+        n_users = seed(connection, n_rows)
+        users = rng.integers(1, n_users + 1, N_REQUESTS)
+        headers = {user: {'Authorization': f"Bearer {create_refresh_token(identity=f'user{user}')}"}
+                   for user in set(users.tolist())}
+        held = {user: connection.execute("SELECT ticker FROM stocks WHERE user_id = ? LIMIT 1", (int(user),)).fetchone()[0]
+                for user in headers}
+
+    timings = {'get': [], 'put': [], 'delete': [], 'scan': []}
+    for user in users.tolist():
+        ticker = held[user]
+
+        start = time.perf_counter()
+        client.get('/stocks/stocks/', headers=headers[user])
+        timings['get'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        client.put('/stocks/stocks/', json={'ticker': ticker, 'quantity': 5, 'average_price': 10.0}, headers=headers[user])
+        timings['put'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        client.delete('/stocks/stocks/', json={'ticker': ticker}, headers=headers[user])
+        timings['delete'].append(time.perf_counter() - start)
+
+        # put the holding back so every request sees the same table size
+        client.put('/stocks/stocks/', json={'ticker': ticker, 'quantity': 5, 'average_price': 10.0}, headers=headers[user])
+
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        for user in users[:20].tolist():
+            start = time.perf_counter()
+            connection.execute("SELECT * FROM stocks NOT INDEXED WHERE user_id = ?", (user,)).fetchall()
+            timings['scan'].append(time.perf_counter() - start)
+        db.engine.dispose()
+
+    return {'rows': n_rows, **{name: percentiles(values) for name, values in timings.items()}}
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 3_000_000]
+
+    print(f"{'rows':>10} {'GET p50/p95 (ms)':>17} {'PUT p50/p95 (ms)':>17} {'DELETE p50/p95 (ms)':>20} {'scan p50 (ms)':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in sizes:
+            result = run(n_rows, directory)
+            print(f"{result['rows']:>10} "
+                  f"{result['get'][0]:>8.2f}/{result['get'][1]:<8.2f} "
+                  f"{result['put'][0]:>8.2f}/{result['put'][1]:<8.2f} "
+                  f"{result['delete'][0]:>10.2f}/{result['delete'][1]:<9.2f} "
+                  f"{result['scan'][0]:>14.2f}")
@@ -0,0 +1,257 @@
+"""
+Benchmark suite of the optimizers, the RSI(2) strategy and the API, offline on synthetic price panels
+
+    python -m benchmarks.suite [--tickers 20] [--days 2520] [--strategy-tickers 500] [--repeat 5] [--only api]
+    python -m benchmarks.suite --compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+
+Every run is written as JSON to benchmarks/results/ (or --output) together with the git commit, the parameters
+and the versions it ran with, so runs can be compared over time. --compare prints the change of every benchmark
+between two runs and exits with status 1 when one got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .synthetic import ohlc_panel, price_panel
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# a benchmark is the callable timed and an optional callable run untimed before every call
+Benchmark = Tuple[Callable, Optional[Callable]]
+
+
+def measure(function: Callable, repeat: int, setup: Optional[Callable] = None) -> dict:
+    """
+    Times repeat calls of function after one untimed warm up call
+
+    Args:
+        function (Callable): code to time
+        repeat (int): timed calls
+        setup (Optional[Callable]): run untimed before every call, i.e. to clear a cache
+
+    Returns:
+        dict: median, min and max seconds per call and the number of calls
+    """
+    if setup is not None:
+        setup()
+    function()
+
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return {'median_s': float(np.median(timings)), 'min_s': min(timings), 'max_s': max(timings), 'repeat': repeat}
+
+
+def optimizer_benchmarks(params: dict) -> Dict[str, Benchmark]:
+    from backend.optimizer.backtest import WalkForward
+    from backend.optimizer.covariance import CovarianceService
+    from backend.optimizer.sharpe import Sharpe
+    from backend.optimizer.sortino import Sortino
+
+    price_data = price_panel(n_tickers=params['tickers'], n_days=params['days'])
+    ticker_list = list(price_data.columns)
+    sharpe = Sharpe(ticker_list=ticker_list, price_data=price_data)
+    sortino = Sortino(ticker_list=ticker_list, price_data=price_data)
+
+    return {
+        'optimizer.sharpe': (lambda: sharpe.optimize_portfolio(risk_free_rate=0.02), None),
+        'optimizer.sortino': (lambda: sortino.optimize_portfolio(risk_free_rate=0.02), None),
+        'optimizer.frontier': (lambda: sharpe.efficient_frontier(n_points=20, risk_free_rate=0.02), None),
+        'optimizer.simulate': (lambda: sharpe.simulate(n_portfolios=params['portfolios'], risk_free_rate=0.02, seed=0), None),
+        'optimizer.covariance': (lambda: CovarianceService().update(price_data), None),
+        'optimizer.backtest': (lambda: WalkForward(price_data, rebalance='Q').run(), None)
+    }
+
+
+def strategy_benchmarks(params: dict) -> Dict[str, Benchmark]:
+    from backend.strategies.rsi2 import Rsi2
+
+    bars = ohlc_panel(n_tickers=params['strategy_tickers'], n_days=252)
+    rsi2 = Rsi2()
+
+    def load_bars():
+        rsi2.stock_data = bars.copy()
+
+    def signals():
+        rsi2.filter_by_ta()
+        rsi2.generate_buy_signal()
+
+    return {
+        'strategy.indicators': (lambda: rsi2.add_ta(bars.copy()), None),
+        'strategy.signals': (signals, load_bars)
+    }
+
+
+def api_benchmarks(params: dict, directory: str) -> Dict[str, Benchmark]:
+    """
+    Endpoints through the test client against a SQLite database holding one user with params['tickers'] holdings
+
+    The closes are synced from the synthetic panel up front, so no request downloads anything.
+    """
+    from flask_jwt_extended import create_refresh_token
+    from backend import create_app
+    from backend.config.config import Config
+    from backend.models.stocks import Stock
+    from backend.models.tickers import TickerInfo
+    from backend.models.users import User
+    from backend.optimizer.cache import result_cache
+    from backend.optimizer.price_store import PriceStore, frame_fetcher
+    from backend.utils import db
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'suite.db')}"
+        JOB_STORE_PATH = os.path.join(directory, 'jobs.db')
+        OPTIMIZER_CACHE_BACKEND = 'memory'
+        JWT_SECRET_KEY = 'benchmark-secret-key-of-sufficient-length'
+
+    price_data = price_panel(n_tickers=params['tickers'], n_days=params['days'])
+    ticker_list = list(price_data.columns)
+
+    app = create_app(BenchmarkConfig)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        user = User(first_name='first', last_name='last', username='benchmark', email='benchmark@example.com',
+                    password_hash='x')
+        db.session.add(user)
+        db.session.add_all(TickerInfo(ticker=ticker, company_name=f"Company {ticker}") for ticker in ticker_list)
+        db.session.flush()
+        db.session.add_all(Stock(ticker=ticker, quantity=10.0, average_price=100.0, user_id=user.id)
+                           for ticker in ticker_list)
+        db.session.commit()
+
+        PriceStore(fetcher=frame_fetcher(price_data)).sync(ticker_list)
+        headers = {'Authorization': f"Bearer {create_refresh_token(identity='benchmark')}"}
+
+    def get(url: str) -> Callable:
+        def request():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return request
+
+    def clear_cache():
+        result_cache.invalidate(ticker_list)
+
+    return {
+        'api.stocks': (get('/stocks/stocks/'), None),
+        'api.sharpe': (get('/metrics/sharpe'), clear_cache),
+        'api.sharpe_cached': (get('/metrics/sharpe'), None),
+        'api.sortino': (get('/metrics/sortino'), clear_cache),
+        'api.frontier': (get('/metrics/frontier?points=20'), None),
+        'api.simulate': (get(f"/metrics/simulate?portfolios={params['portfolios']}&points=100"), clear_cache)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(params: dict, only: Optional[str] = None) -> dict:
+    """
+    Runs every benchmark whose name starts with only, all of them if None
+
+    Returns:
+        dict: JSON serializable run, with the timings by benchmark name
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        groups = {
+            'optimizer': lambda: optimizer_benchmarks(params),
+            'strategy': lambda: strategy_benchmarks(params),
+            'api': lambda: api_benchmarks(params, directory)
+        }
+        for group, build in groups.items():
+            if only is not None and not (group.startswith(only) or only.startswith(group)):
+                continue
+            for name, (function, setup) in build().items():
+                if only is not None and not name.startswith(only):
+                    continue
+                results[name] = measure(function, params['repeat'], setup)
+                print(f"{name:<24} {results[name]['median_s'] * 1000:>10.2f} ms")
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'params': params,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__
+        },
+        'results': results
+    }
+
+
+def compare(before: dict, after: dict, threshold: float) -> bool:
+    """
+    Prints the median of every benchmark of two runs and their ratio
+
+    Returns:
+        bool: True if any benchmark in both runs got slower than threshold (after / before)
+    """
+    if before['params'] != after['params']:
+        print(f"warning: the runs used different parameters\n  {before['params']}\n  {after['params']}")
+
+    print(f"{'benchmark':<24} {'before (ms)':>12} {'after (ms)':>12} {'ratio':>7}")
+    regressed = False
+    for name in sorted(set(before['results']) | set(after['results'])):
+        old, new = before['results'].get(name), after['results'].get(name)
+        if old is None or new is None:
+            old, new = (f"{run['median_s'] * 1000:.2f}" if run is not None else '-' for run in (old, new))
+            print(f"{name:<24} {old:>12} {new:>12}")
+            continue
+
+        ratio = new['median_s'] / old['median_s']
+        flag = '  slower' if ratio > threshold else ''
+        regressed |= ratio > threshold
+        print(f"{name:<24} {old['median_s'] * 1000:>12.2f} {new['median_s'] * 1000:>12.2f} {ratio:>6.2f}x{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument('--tickers', type=int, default=20, help="holdings optimized and served by the API")
+    parser.add_argument('--days', type=int, default=252 * 10, help="trading days of the synthetic closes")
+    parser.add_argument('--strategy-tickers', type=int, default=500, help="tickers the RSI(2) strategy screens")
+    parser.add_argument('--portfolios', type=int, default=10_000, help="random portfolios of the simulations")
+    parser.add_argument('--repeat', type=int, default=5, help="timed calls per benchmark")
+    parser.add_argument('--only', help="run the benchmarks whose name starts with this, i.e. api or optimizer.sharpe")
+    parser.add_argument('--output', help="file the run is written to, a timestamped file in benchmarks/results/ by default")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="compare two runs instead of running")
+    parser.add_argument('--threshold', type=float, default=1.2, help="after / before ratio --compare fails on")
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path) as f:
+                runs.append(json.load(f))
+        sys.exit(1 if compare(*runs, threshold=args.threshold) else 0)
+
+    result = run({'tickers': args.tickers, 'days': args.days, 'strategy_tickers': args.strategy_tickers,
+                  'portfolios': args.portfolios, 'repeat': args.repeat}, only=args.only)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{(result['commit'] or 'unknown')[:8]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
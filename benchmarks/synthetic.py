@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+
+def price_panel(n_tickers: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a synthetic panel of daily closes following a geometric Brownian motion
+
+    Args:
+        n_tickers (int): number of columns
+        n_days (int): number of business days
+        seed (int): random seed so runs are comparable
+
+    Returns:
+        pd.DataFrame: closing prices indexed by date with one column per ticker (T0000, T0001, ...)
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0003, 0.0002, n_tickers)
+    volatility = rng.uniform(0.005, 0.03, n_tickers)
+    log_returns = rng.normal(drift, volatility, (n_days, n_tickers))
+
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    return pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)), index=dates, columns=tickers)
+
+
+def ohlc_panel(n_tickers: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates synthetic daily bars in the long layout Rsi2.set_stock_data produces
+
+    Args:
+        n_tickers (int): number of tickers
+        n_days (int): number of business days
+        seed (int): random seed so runs are comparable
+
+    Returns:
+        pd.DataFrame: Open, High, Low, Close and Volume indexed by Date with a Ticker column, sorted by ticker then date
+    """
+    rng = np.random.default_rng(seed)
+    closes = price_panel(n_tickers=n_tickers, n_days=n_days, seed=seed)
+    spread = rng.uniform(0.0, 0.02, closes.shape)
+
+    bars = pd.DataFrame({
+        'Open': (closes.shift(1).fillna(closes) * (1 + rng.normal(0, 0.003, closes.shape))).stack(),
+        'High': (closes * (1 + spread)).stack(),
+        'Low': (closes * (1 - spread)).stack(),
+        'Close': closes.stack(),
+        'Volume': pd.DataFrame(rng.integers(10_000, 1_000_000, closes.shape), index=closes.index, columns=closes.columns).stack()
+    })
+    bars.index.names = ['Date', 'Ticker']
+    bars = bars.reset_index().sort_values(['Ticker', 'Date']).set_index('Date')
+    return bars
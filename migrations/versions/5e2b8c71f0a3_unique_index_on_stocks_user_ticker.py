@@ -0,0 +1,53 @@
+"""Unique index on stocks user_id and ticker
+
+Revision ID: 5e2b8c71f0a3
+Revises: d93b2f4a6c18
+Create Date: 2026-10-18 17:24:10.318562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8c71f0a3'
+down_revision = 'd93b2f4a6c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # merge duplicate holdings into the oldest row: summed quantity at the quantity weighted average price. The
+    # merged values go through a table of their own because MySQL cannot update stocks from a subquery on stocks
+    op.create_table('stock_merges',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('average_price', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO stock_merges (id, quantity, average_price)
+        SELECT MIN(id), SUM(quantity), SUM(quantity * average_price) / NULLIF(SUM(quantity), 0)
+        FROM stocks
+        GROUP BY user_id, ticker
+        HAVING COUNT(*) > 1
+    """)
+    op.execute("""
+        UPDATE stocks SET
+            average_price = COALESCE((SELECT m.average_price FROM stock_merges m WHERE m.id = stocks.id), average_price),
+            quantity = (SELECT m.quantity FROM stock_merges m WHERE m.id = stocks.id)
+        WHERE id IN (SELECT id FROM stock_merges)
+    """)
+    op.execute("""
+        DELETE FROM stocks
+        WHERE id NOT IN (SELECT keep.id FROM (SELECT MIN(id) AS id FROM stocks GROUP BY user_id, ticker) AS keep)
+    """)
+    op.drop_table('stock_merges')
+
+    with op.batch_alter_table('stocks', schema=None) as batch_op:
+        batch_op.create_index('ix_stocks_user_id_ticker', ['user_id', 'ticker'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('stocks', schema=None) as batch_op:
+        batch_op.drop_index('ix_stocks_user_id_ticker')
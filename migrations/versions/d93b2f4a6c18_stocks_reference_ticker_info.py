@@ -0,0 +1,48 @@
+"""Stocks reference ticker_info instead of copying metadata
+
+Revision ID: d93b2f4a6c18
+Revises: a41d6c0e7b25
+Create Date: 2026-10-18 16:02:51.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93b2f4a6c18'
+down_revision = 'a41d6c0e7b25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # move the metadata already copied onto stocks into ticker_info, one row per symbol
+    op.execute("""
+        INSERT INTO ticker_info (ticker, company_name, sector, industry, updated_at)
+        SELECT ticker, MAX(company_name), MAX(sector), MAX(industry), CURRENT_TIMESTAMP
+        FROM stocks
+        WHERE ticker NOT IN (SELECT ticker FROM ticker_info)
+        GROUP BY ticker
+    """)
+
+    with op.batch_alter_table('stocks', schema=None) as batch_op:
+        batch_op.create_foreign_key('fk_stocks_ticker_ticker_info', 'ticker_info', ['ticker'], ['ticker'])
+        batch_op.drop_column('industry')
+        batch_op.drop_column('sector')
+        batch_op.drop_column('company_name')
+
+
+def downgrade():
+    with op.batch_alter_table('stocks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('company_name', sa.String(length=128), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('sector', sa.String(length=128), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('industry', sa.String(length=128), nullable=False, server_default=''))
+        batch_op.drop_constraint('fk_stocks_ticker_ticker_info', type_='foreignkey')
+
+    op.execute("""
+        UPDATE stocks SET
+            company_name = (SELECT company_name FROM ticker_info WHERE ticker_info.ticker = stocks.ticker),
+            sector = (SELECT sector FROM ticker_info WHERE ticker_info.ticker = stocks.ticker),
+            industry = (SELECT industry FROM ticker_info WHERE ticker_info.ticker = stocks.ticker)
+    """)
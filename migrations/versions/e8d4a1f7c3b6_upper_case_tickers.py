@@ -0,0 +1,64 @@
+"""Upper case and trim the tickers of stocks and ticker_info
+
+Revision ID: e8d4a1f7c3b6
+Revises: c4e9a7d2b518
+Create Date: 2026-10-19 10:12:37.604215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8d4a1f7c3b6'
+down_revision = 'c4e9a7d2b518'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the normalized metadata row first, so every holding still references one once its ticker is rewritten
+    op.execute("""
+        INSERT INTO ticker_info (ticker, company_name, sector, industry, updated_at)
+        SELECT UPPER(TRIM(ticker)), MAX(company_name), MAX(sector), MAX(industry), MAX(updated_at)
+        FROM ticker_info
+        WHERE ticker <> UPPER(TRIM(ticker))
+          AND UPPER(TRIM(ticker)) NOT IN (SELECT ticker FROM ticker_info)
+        GROUP BY UPPER(TRIM(ticker))
+    """)
+
+    # holdings of the same user differing only by case are merged into the oldest row: summed quantity at the
+    # quantity weighted average price. The merged values go through a table of their own because MySQL cannot
+    # update stocks from a subquery on stocks
+    op.create_table('stock_merges',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('average_price', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO stock_merges (id, quantity, average_price)
+        SELECT MIN(id), SUM(quantity), SUM(quantity * average_price) / NULLIF(SUM(quantity), 0)
+        FROM stocks
+        GROUP BY user_id, UPPER(TRIM(ticker))
+        HAVING COUNT(*) > 1
+    """)
+    op.execute("""
+        UPDATE stocks SET
+            average_price = COALESCE((SELECT m.average_price FROM stock_merges m WHERE m.id = stocks.id), average_price),
+            quantity = (SELECT m.quantity FROM stock_merges m WHERE m.id = stocks.id)
+        WHERE id IN (SELECT id FROM stock_merges)
+    """)
+    op.execute("""
+        DELETE FROM stocks
+        WHERE id NOT IN (SELECT keep.id FROM (SELECT MIN(id) AS id FROM stocks GROUP BY user_id, UPPER(TRIM(ticker))) AS keep)
+    """)
+    op.drop_table('stock_merges')
+
+    op.execute("UPDATE stocks SET ticker = UPPER(TRIM(ticker)) WHERE ticker <> UPPER(TRIM(ticker))")
+    op.execute("DELETE FROM ticker_info WHERE ticker <> UPPER(TRIM(ticker))")
+
+
+def downgrade():
+    # the original spelling of merged tickers is gone, upper case tickers are valid before this revision too
+    pass
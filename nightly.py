@@ -0,0 +1,6 @@
+from backend.optimizer.batch import run_batch
+
+# run once a night, i.e. a cron entry calling `python nightly.py` after the market closes
+if __name__ == "__main__":
+    stored = run_batch()
+    print(f"Stored {stored} portfolio metrics")
@@ -0,0 +1,9 @@
+import sys
+from backend.strategies.rsi2 import Rsi2
+from backend.strategies.runner import StrategyRunner, run_scheduled
+
+# runs every registered strategy at the STRATEGY_SCHEDULE times, `python run_strategies.py --once` runs them now
+if __name__ == "__main__":
+    runner = StrategyRunner()
+    runner.register(Rsi2())
+    run_scheduled(runner, once='--once' in sys.argv[1:])
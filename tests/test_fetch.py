@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from backend.strategies.fetch import CachedFetcher, build_session
+from backend.strategies.rsi2 import Rsi2
+
+ETAG = '"screen-v1"'
+BODY = b"<html><body>screen</body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves the paths the tests fetch, counting the requests each path receives
+    """
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+            server.headers_seen.append((self.path, dict(self.headers)))
+
+        if self.path == '/etag':
+            if self.headers.get('If-None-Match') == ETAG:
+                self.reply(304)
+            else:
+                self.reply(200, BODY, {'ETag': ETAG})
+        elif self.path == '/flaky':
+            # busy for the first two requests
+            if hits <= 2:
+                self.reply(503, b"busy")
+            else:
+                self.reply(200, BODY)
+        elif self.path == '/down':
+            self.reply(503, b"busy")
+        elif self.path == '/slow':
+            time.sleep(1)
+            self.reply(200, BODY)
+        elif self.path == '/empty':
+            self.reply(200, b"", {'ETag': '"empty"'})
+        else:
+            self.reply(404)
+
+    def reply(self, status: int, body: bytes = b"", headers: dict = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class CachedFetcherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        self.server.hits = {}
+        self.server.headers_seen = []
+        self.cache_dir = tempfile.mkdtemp()
+        self.fetcher = CachedFetcher(cache_dir=self.cache_dir,
+                                     session=build_session(retries=3, backoff_factor=0),
+                                     timeout=0.3)
+
+    def tearDown(self) -> None:
+        self.fetcher.session.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_etag_is_stored_and_304_serves_the_cached_body(self) -> None:
+        first = self.fetcher.fetch(f"{self.base_url}/etag")
+        self.assertEqual((first.status_code, first.content, first.modified), (200, BODY, True))
+
+        second = self.fetcher.fetch(f"{self.base_url}/etag")
+        self.assertEqual((second.status_code, second.content, second.modified), (304, BODY, False))
+
+        path, headers = self.server.headers_seen[-1]
+        self.assertEqual(headers.get('If-None-Match'), ETAG)
+
+    def test_5xx_is_retried(self) -> None:
+        page = self.fetcher.fetch(f"{self.base_url}/flaky")
+        self.assertEqual((page.status_code, page.content), (200, BODY))
+        self.assertEqual(self.server.hits['/flaky'], 3)
+
+    def test_5xx_after_the_retries_returns_no_content(self) -> None:
+        page = self.fetcher.fetch(f"{self.base_url}/down")
+        self.assertEqual((page.status_code, page.content), (503, None))
+        self.assertEqual(self.server.hits['/down'], 4)
+
+    def test_stalled_server_times_out(self) -> None:
+        self.fetcher.session = build_session(retries=0)
+        started = time.monotonic()
+        with self.assertRaises(requests.RequestException):
+            self.fetcher.fetch(f"{self.base_url}/slow")
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_empty_screen_is_not_stored(self) -> None:
+        rsi2 = Rsi2(fetcher=self.fetcher, screen_url=f"{self.base_url}/empty")
+        rsi2.etf_snapshot_dir = os.path.join(self.cache_dir, 'snapshots')
+        rsi2.should_scrape = lambda: True
+
+        rsi2.scrape()
+        self.assertFalse(os.path.exists(rsi2.new_etf_snapshot_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import optimize
+from backend.optimizer.sharpe import Sharpe
+from backend.optimizer.sortino import Sortino
+
+TICKERS = ['A', 'B', 'C', 'D', 'E']
+
+
+def price_data(seed: int = 0, n_days: int = 500) -> pd.DataFrame:
+    """
+    Random walk closes with a different drift and volatility per ticker
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.uniform(-0.0002, 0.001, len(TICKERS))
+    volatility = rng.uniform(0.005, 0.02, len(TICKERS))
+    log_returns = rng.normal(drift, volatility, (n_days, len(TICKERS)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)),
+                        index=pd.bdate_range('2022-01-03', periods=n_days),
+                        columns=TICKERS)
+
+
+def random_weights(rng: np.random.Generator) -> np.ndarray:
+    weights = rng.uniform(0.05, 1, len(TICKERS))
+    return weights / weights.sum()
+
+
+class GradientTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.price_data = price_data()
+        self.log_returns = np.log(self.price_data / self.price_data.shift(1)).dropna()
+        self.rng = np.random.default_rng(1)
+
+    def relative_error(self, fun, jac, weights: np.ndarray, args: tuple) -> float:
+        return optimize.check_grad(fun, jac, weights, *args) / max(np.linalg.norm(jac(weights, *args)), 1.0)
+
+    def test_sharpe_gradient_matches_finite_differences(self) -> None:
+        sharpe = Sharpe(TICKERS, price_data=self.price_data)
+        args = (self.log_returns.mean().values, self.log_returns.cov().values, 0.02)
+
+        for _ in range(5):
+            error = self.relative_error(sharpe.neg_sharpe, sharpe.neg_sharpe_gradient, random_weights(self.rng), args)
+            self.assertLess(error, 1e-4)
+
+    def test_sortino_gradient_matches_finite_differences(self) -> None:
+        sortino = Sortino(TICKERS, price_data=self.price_data)
+        returns = np.ascontiguousarray(self.log_returns.values)
+        args = (returns.mean(axis=0), returns, 0.02)
+
+        for _ in range(5):
+            error = self.relative_error(sortino.neg_sortino, sortino.neg_sortino_gradient, random_weights(self.rng), args)
+            self.assertLess(error, 1e-4)
+
+    def test_optimizers_pass_their_own_gradient_check(self) -> None:
+        for optimizer_class in (Sharpe, Sortino):
+            with self.subTest(optimizer=optimizer_class.__name__):
+                optimizer = optimizer_class(TICKERS, price_data=self.price_data, check_gradients=True)
+                weights = optimizer.optimize_portfolio(risk_free_rate=0.02)[0]
+                self.assertAlmostEqual(weights.sum(), 1, places=3)
+
+    def test_check_gradient_rejects_a_wrong_gradient(self) -> None:
+        sharpe = Sharpe(TICKERS, price_data=self.price_data)
+        args = (self.log_returns.mean().values, self.log_returns.cov().values, 0.02)
+        wrong_gradient = lambda weights, *args: 2 * sharpe.neg_sharpe_gradient(weights, *args)
+
+        with self.assertRaises(ValueError):
+            sharpe.check_gradient(sharpe.neg_sharpe, wrong_gradient, random_weights(self.rng), args)
+
+
+if __name__ == '__main__':
+    unittest.main()
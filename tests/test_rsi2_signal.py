@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import pandas as pd
+from backend.strategies.rsi2 import Rsi2
+
+
+def row_loop_buy_signal(stock_data: pd.DataFrame) -> pd.Series:
+    """
+    The per ticker, per touch, per day loop generate_buy_signal replaced, kept as the reference
+    """
+    stock_data = stock_data.copy()
+    for ticker in stock_data['Ticker'].unique():
+        ticker_data = stock_data[stock_data['Ticker'] == ticker]
+        donchian_upper_days = ticker_data[ticker_data['at_donchian_upper']].index
+
+        for upper_day in donchian_upper_days:
+            subsequent_days = ticker_data.loc[upper_day:].index
+
+            for day in subsequent_days:
+                if ticker_data.loc[day, 'below_30_rsi2']:
+                    stock_data.loc[day, 'buy_signal'] = True
+                    break
+    return stock_data['buy_signal']
+
+
+def signal_frame(seed: int, n_tickers: int = 4, n_days: int = 60,
+                 touch_rate: float = 0.15, oversold_rate: float = 0.2) -> pd.DataFrame:
+    """
+    Builds stock_data in the layout filter_by_ta leaves, with random touches and oversold days
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.repeat([f"T{i}" for i in range(n_tickers)], n_days)
+    dates = np.tile(pd.bdate_range('2024-01-01', periods=n_days), n_tickers)
+    stock_data = pd.DataFrame({'Ticker': tickers,
+                               'at_donchian_upper': rng.random(len(tickers)) < touch_rate,
+                               'below_30_rsi2': rng.random(len(tickers)) < oversold_rate,
+                               'buy_signal': False})
+    stock_data.index = pd.MultiIndex.from_arrays([tickers, dates], names=['Ticker', 'Date'])
+    return stock_data
+
+
+class GenerateBuySignalTest(unittest.TestCase):
+
+    def vectorized(self, stock_data: pd.DataFrame) -> pd.Series:
+        rsi2 = Rsi2()
+        rsi2.stock_data = stock_data.copy()
+        rsi2.generate_buy_signal()
+        return rsi2.stock_data['buy_signal']
+
+    def test_matches_the_row_loop(self) -> None:
+        for seed in range(3):
+            for touch_rate, oversold_rate in ((0.05, 0.1), (0.15, 0.2), (0.5, 0.5)):
+                with self.subTest(seed=seed, touch_rate=touch_rate, oversold_rate=oversold_rate):
+                    stock_data = signal_frame(seed, touch_rate=touch_rate, oversold_rate=oversold_rate)
+                    expected = row_loop_buy_signal(stock_data)
+                    pd.testing.assert_series_equal(self.vectorized(stock_data), expected, check_dtype=False)
+
+    def test_touch_arms_only_the_next_oversold_day(self) -> None:
+        stock_data = signal_frame(0, n_tickers=1, n_days=8)
+        stock_data['at_donchian_upper'] = [False, True, False, False, False, True, False, False]
+        stock_data['below_30_rsi2'] = [True, False, False, True, True, True, True, False]
+
+        buys = self.vectorized(stock_data).tolist()
+        self.assertEqual(buys, [False, False, False, True, False, True, False, False])
+        self.assertEqual(buys, row_loop_buy_signal(stock_data).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,4 @@
+from backend.jobs.worker import run_workers
+
+if __name__ == "__main__":
+    run_workers()